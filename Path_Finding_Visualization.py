@@ -1,15 +1,131 @@
-from start_screen import TK
+import argparse
+import sys
+from constants import MAP_FILE
+
+# Modules are imported where they are first needed, so the command line
+# modes never load tkinter and the headless one never loads pygame
+
+def begin(saved = None):
+	# Begins the program. Escape in the grid comes back to the menu without
+	# starting Python again, and the map is kept for the next grid of the
+	# same size.
+	from start_screen import TK
+
+	while True:
+		options = TK().run()
+		if options is None:
+			return
+
+		print("Starting Application...")
+		from grid import init_grid
+		print("Successfully Loaded!")
+
+		saved = init_grid(*options, saved = saved)
+		if saved is None:
+			return
+
+def replay(filename, tile_size = 20, speed = 1):
+	# Replays a trace saved with the 't' key
+	from grid import play_trace
+	play_trace(filename, int(tile_size), int(speed))
+
+def read_map(args):
+	# Snapshot of the map given on the command line, as the grid module
+	# takes it: size, walls, start and finish. None for an empty grid.
+	if args.map:
+		import map_io
+		map_file = map_io.MapFile(args.map)
+		saved = (map_file.rows, map_file.cols, map_file.walls(), map_file.start, map_file.finish)
+		map_file.close()
+		return saved
+
+	if args.generate:
+		import generators
+		generated = generators.generate(args.generate, args.size[0], args.size[1], args.seed)
+		return (generated.rows, generated.cols, bytes(generated.walls), generated.start, generated.finish)
+
+	return None
+
+def run_headless(algorithm, saved):
+	# Runs one search on the map without a window and prints its numbers
+	from compact_grid import CompactGrid
+	from pathfinding_algos import ALGORITHMS
+	from instrumentation import format_time
+	from thread import Thread
+
+	rows, cols, walls, start, finish = saved
+	if not (start and finish):
+		sys.exit("The map has no start and finish cells")
+
+	grid = CompactGrid(rows, cols)
+	grid.load_walls(walls, start, finish)
+
+	thread = Thread(animate = False)
+	thread.turn_on()
+	ALGORITHMS[algorithm](grid, thread)
+
+	result = grid.last_run[-1]
+	stats = thread.stats
+	print('Algorithm: {}   Expanded: {}   Pushes: {}   Duplicates: {}   Neighbors: {}'.format(algorithm,
+		stats.expansions, stats.pushes, stats.duplicate_pushes, stats.neighbor_calls))
+	times = 'Cost: {}   Length: {}   Time: {}'.format(result.cost, len(result.path), format_time(stats.search_time))
+
+	if stats.build_time:
+		times += '   Build: ' + format_time(stats.build_time)
+
+	print(times)
+
+def size(text):
+	rows, cols = text.lower().split('x')
+	return int(rows), int(cols)
+
+def parse_args(argv):
+	from pathfinding_algos import ALGORITHMS
+	from generators import GENERATORS
+
+	parser = argparse.ArgumentParser(description = "Path finding visualizer. Without arguments the start menu is shown.")
+	parser.add_argument("trace", nargs = "?", help = "trace saved with 't' to replay")
+	parser.add_argument("replay_tile_size", nargs = "?", type = int, default = 20, help = "tile size of the replay")
+	parser.add_argument("speed", nargs = "?", type = int, default = 1, help = "steps of the replay per frame")
+	parser.add_argument("--algorithm", choices = list(ALGORITHMS), help = "algorithm to run, skipping the menu")
+	parser.add_argument("--size", type = size, default = (25, 25), help = "rows x columns of the grid, e.g. 40x40")
+	parser.add_argument("--tile-size", type = int, default = 20, help = "pixels per tile")
+	parser.add_argument("--map", nargs = "?", const = MAP_FILE, help = "map file to load, {} by default".format(MAP_FILE))
+	parser.add_argument("--generate", choices = list(GENERATORS), help = "generator of the map, when no map file is given")
+	parser.add_argument("--seed", type = int, help = "seed of the generated map")
+	parser.add_argument("--headless", action = "store_true", help = "search once without a window and print the result")
+
+	return parser.parse_args(argv)
 
-def begin():
-	# Begins the program 
-	start_window = TK()
-	start_window.run()
-		
 def main():
-	begin()
-	
-if __name__ == "__main__":
-	main()
+	# A trace file, and optionally a tile size and speed, can be given to replay a search
+	if len(sys.argv) == 1:
+		begin()
+		return
 
+	args = parse_args(sys.argv[1:])
 
+	if args.trace:
+		replay(args.trace, args.replay_tile_size, args.speed)
+		return
 
+	algorithm = args.algorithm or "A*"
+	saved = read_map(args)
+
+	if args.headless:
+		if saved is None:
+			sys.exit("--headless needs a map, from --map or --generate")
+
+		run_headless(algorithm, saved)
+		return
+
+	from grid import init_grid
+	rows, cols = saved[:2] if saved else args.size
+
+	# Escape goes on to the menu, keeping the map
+	saved = init_grid(algorithm, rows, cols, args.tile_size, saved = saved)
+	if saved is not None:
+		begin(saved)
+
+if __name__ == "__main__":
+	main()
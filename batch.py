@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import search
+
+# Chunks handed to every worker on average. More chunks balance the load
+# better, fewer cost less to send.
+CHUNKS_PER_WORKER = 8
+
+# Map of the worker process, attached once by init_worker
+worker_grid = None
+worker_memory = None
+
+def share_map(grid):
+	# Copies the walls, costs and neighbor masks of a grid into one block of
+	# shared memory, one byte per cell each
+	size = grid.rows * grid.cols
+	memory = shared_memory.SharedMemory(create = True, size = size * 3)
+
+	memory.buf[:size] = bytes(grid.walls)
+	memory.buf[size:size * 2] = bytes(grid.costs)
+	memory.buf[size * 2:] = bytes(grid.adjacency)
+
+	return memory
+
+def attach_map(memory, rows, cols):
+	# Builds a search grid over a block written by share_map
+	size = rows * cols
+	buffer = memory.buf
+
+	return search.SearchGrid.from_buffers(rows, cols, buffer[:size], buffer[size:size * 2], buffer[size * 2:size * 3])
+
+def init_worker(name, rows, cols):
+	global worker_grid, worker_memory
+
+	worker_memory = shared_memory.SharedMemory(name = name)
+	worker_grid = attach_map(worker_memory, rows, cols)
+
+def solve_chunk(algorithm, chunk):
+	# Runs in a worker: answers (query number, start, finish) queries on the shared map
+	return [(number, algorithm(worker_grid, start, finish)) for number, start, finish in chunk]
+
+def solve_batch(grid, queries, algorithm = search.a_star, workers = None, chunk_size = None):
+	# Answers many (start, finish) queries on one map with a pool of
+	# processes. The map is placed in shared memory once instead of being
+	# sent with every task, and later edits of the grid are not seen.
+	# Yields (query number, SearchResult) pairs as they complete, which is
+	# not the order of the queries.
+	queries = list(queries)
+	workers = workers or os.cpu_count() or 1
+
+	if chunk_size is None:
+		chunk_size = max(len(queries) // (workers * CHUNKS_PER_WORKER), 1)
+
+	numbered = [(number, start, finish) for number, (start, finish) in enumerate(queries)]
+	chunks = [numbered[i:i + chunk_size] for i in range(0, len(numbered), chunk_size)]
+	memory = share_map(grid)
+
+	try:
+		with ProcessPoolExecutor(workers, initializer = init_worker, initargs = (memory.name, grid.rows, grid.cols)) as pool:
+			futures = [pool.submit(solve_chunk, algorithm, chunk) for chunk in chunks]
+
+			for future in as_completed(futures):
+				yield from future.result()
+	finally:
+		memory.close()
+		memory.unlink()
+
+def solve_all(grid, queries, algorithm = search.a_star, workers = None, chunk_size = None):
+	# Same as solve_batch, but returns the results in the order of the queries
+	queries = list(queries)
+	results = [None] * len(queries)
+
+	for number, result in solve_batch(grid, queries, algorithm, workers, chunk_size):
+		results[number] = result
+
+	return results
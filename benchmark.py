@@ -0,0 +1,181 @@
+import argparse
+import csv
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from functools import partial
+import search
+import wavefront
+from priority_queue import BucketQueue
+
+# Algorithms from the search module that are measured
+ALGORITHMS = {
+	"DFS": search.dfs,
+	"BFS": search.bfs,
+	"Dijkstras": search.dijkstras,
+	"Dijkstras (buckets)": partial(search.dijkstras, queue = BucketQueue),
+	"A*": search.a_star,
+	"JPS": search.jps,
+	"Bidirectional BFS": search.bidirectional_bfs,
+	"Bidirectional A*": search.bidirectional_a_star,
+}
+
+# The wavefront search needs numpy
+if wavefront.np is not None:
+	ALGORITHMS["Wavefront BFS"] = wavefront.wavefront
+
+# Side lengths of the square maps and fractions of walls benchmarked by default
+SIZES = [10, 100, 500, 1000, 2000, 4000]
+DENSITIES = [0.0, 0.1, 0.2, 0.3]
+
+# Side lengths of the square maps used by the scaling benchmark
+SCALING_SIZES = [100, 200, 400, 800]
+
+# How much slower a single expansion may become on the largest map compared
+# to the smallest one before the scaling benchmark reports a regression
+SCALING_TOLERANCE = 3.0
+
+# Columns of the results, in the order they are written
+FIELDS = ["algorithm", "size", "density", "seed", "found", "cost", "expanded",
+	"expansions_per_second", "max_frontier", "peak_memory", "wall_time"]
+
+def random_map(size, density, seed):
+	# Builds a square map with the given fraction of walls, leaving the corners open
+	rng = random.Random(seed)
+	grid = search.SearchGrid(size, size)
+
+	walls = bytearray(1 if rng.random() < density else 0 for i in range(size * size))
+	walls[0] = 0
+	walls[-1] = 0
+	grid.load_walls(walls)
+
+	return grid
+
+def time_search(algorithm, grid):
+	# Runs a search from the top left to the bottom right corner
+	start = time.perf_counter()
+	result = algorithm(grid, (0, 0), (grid.rows - 1, grid.cols - 1))
+	elapsed = time.perf_counter() - start
+
+	return result, elapsed
+
+def peak_memory(algorithm, grid):
+	# Runs the search again under tracemalloc, which would skew the timing,
+	# and returns the most memory it allocated at once in bytes
+	tracemalloc.start()
+	algorithm(grid, (0, 0), (grid.rows - 1, grid.cols - 1))
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	return peak
+
+def run_case(name, grid, size, density, seed, measure_memory = True):
+	# Measures one algorithm on one map
+	algorithm = ALGORITHMS[name]
+	result, elapsed = time_search(algorithm, grid)
+
+	return {
+		"algorithm": name,
+		"size": size,
+		"density": density,
+		"seed": seed,
+		"found": result.found,
+		"cost": result.cost if result.found else None,
+		"expanded": result.expanded,
+		"expansions_per_second": round(result.expanded / elapsed) if elapsed > 0 else None,
+		"max_frontier": result.max_frontier,
+		"peak_memory": peak_memory(algorithm, grid) if measure_memory else None,
+		"wall_time": elapsed,
+	}
+
+def run_benchmark(algorithms, sizes, densities, seed, measure_memory = True):
+	# Runs every algorithm on a seeded map of every size and wall density
+	results = []
+
+	for size in sizes:
+		for density in densities:
+			grid = random_map(size, density, seed)
+
+			for name in algorithms:
+				row = run_case(name, grid, size, density, seed, measure_memory)
+				results.append(row)
+
+				print("{:<10} {:>5}x{:<5} density: {:.2f}  expanded: {:>9}  {:>9} exp/s  frontier: {:>8}  time: {:8.3f}s".format(
+					name, size, size, density, row["expanded"], row["expansions_per_second"] or 0,
+					row["max_frontier"], row["wall_time"]))
+
+	return results
+
+def write_results(results, filename):
+	# Writes the results as CSV if the file name ends in .csv, as JSON otherwise
+	if filename.endswith(".csv"):
+		with open(filename, "w", newline = "") as file:
+			writer = csv.DictWriter(file, fieldnames = FIELDS)
+			writer.writeheader()
+			writer.writerows(results)
+	else:
+		report = {
+			"python": platform.python_version(),
+			"platform": platform.platform(),
+			"time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+			"results": results,
+		}
+
+		with open(filename, "w") as file:
+			json.dump(report, file, indent = 1)
+
+def scaling_benchmark(sizes = SCALING_SIZES, density = 0.2, seed = 0):
+	# Measures the time per expanded cell of every algorithm as the map grows.
+	# Returns the algorithms whose time per expansion grew more than
+	# SCALING_TOLERANCE times between the smallest and the largest map.
+	regressions = []
+
+	for name, algorithm in ALGORITHMS.items():
+		per_expansion = []
+
+		for size in sizes:
+			grid = random_map(size, density, seed)
+			result, elapsed = time_search(algorithm, grid)
+			per_expansion.append(elapsed / max(result.expanded, 1))
+
+			print("{:<10} {:>5}x{:<5} expanded: {:>8}  time: {:8.3f}s  per expansion: {:6.2f}us".format(
+				name, size, size, result.expanded, elapsed, per_expansion[-1] * 1e6))
+
+		if per_expansion[-1] > per_expansion[0] * SCALING_TOLERANCE:
+			regressions.append(name)
+
+	return regressions
+
+def parse_args(args):
+	parser = argparse.ArgumentParser(description = "Benchmarks the path finding algorithms without rendering")
+	parser.add_argument("--algorithms", nargs = "+", choices = list(ALGORITHMS), default = list(ALGORITHMS))
+	parser.add_argument("--sizes", nargs = "+", type = int, default = SIZES)
+	parser.add_argument("--densities", nargs = "+", type = float, default = DENSITIES)
+	parser.add_argument("--seed", type = int, default = 0)
+	parser.add_argument("--output", default = "benchmark_results.json", help = "results file, .json or .csv")
+	parser.add_argument("--no-memory", action = "store_true", help = "skip the tracemalloc pass")
+	parser.add_argument("--scaling", action = "store_true", help = "only check that expansion time scales linearly")
+
+	return parser.parse_args(args)
+
+def main(args = None):
+	options = parse_args(sys.argv[1:] if args is None else args)
+
+	if options.scaling:
+		regressions = scaling_benchmark()
+
+		if regressions:
+			print("Expansion time does not scale linearly for: " + ", ".join(regressions))
+			sys.exit(1)
+
+		return
+
+	results = run_benchmark(options.algorithms, options.sizes, options.densities, options.seed, not options.no_memory)
+	write_results(results, options.output)
+	print("Wrote {} results to {}".format(len(results), options.output))
+
+if __name__ == "__main__":
+	main()
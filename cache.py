@@ -0,0 +1,133 @@
+from collections import OrderedDict
+
+# Number of results a PathCache keeps by default
+CACHE_SIZE = 128
+
+# Number of edits a grid remembers for revalidating cached results. Results
+# stored before the oldest remembered edit are searched again.
+EDIT_LOG_SIZE = 1024
+
+def edits_since(grid, version):
+	# Returns the (version, coords, wall) edits made to the grid after the
+	# given version, or None if some of them are no longer remembered
+	if version == grid.version:
+		return []
+
+	edits = grid.edits
+	if not edits or edits[0][0] > version + 1:
+		return None
+
+	return [edit for edit in edits if edit[0] > version]
+
+def log_edits(grid, cells, wall):
+	# Records edits of cells as one new version of the grid. The log only
+	# ever drops whole versions, oldest first, so edits_since never returns
+	# part of one. A batch longer than the log replaces it, and older results
+	# are searched again instead of being revalidated.
+	grid.version += 1
+	edits = grid.edits
+
+	if len(cells) >= edits.maxlen:
+		edits.clear()
+		return
+
+	while len(edits) + len(cells) > edits.maxlen:
+		oldest = edits[0][0]
+
+		while edits and edits[0][0] == oldest:
+			edits.popleft()
+
+	edits.extend((grid.version, coords, wall) for coords in cells)
+
+def still_valid(grid, version, path):
+	# A result stays correct if every edit since it was stored added a wall
+	# off its path. Adding walls can only make other paths longer, and moving
+	# the start or finish cell does not change which cells can be entered.
+	edits = edits_since(grid, version)
+	if edits is None:
+		return False
+
+	cells = set(path)
+
+	for _, coords, wall in edits:
+		if wall is None:
+			continue
+
+		if not wall or coords in cells:
+			return False
+
+	return True
+
+class PathCache:
+	def __init__(self, capacity = CACHE_SIZE):
+		# Least recently used cache of search results. A result is stored
+		# with the map version it was found on and answers the same start,
+		# finish and algorithm on that version, or on a later one that it is
+		# still valid for.
+		self.capacity = capacity
+		self.entries = OrderedDict()
+
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.revalidations = 0
+
+	def get(self, grid, start, finish, algorithm):
+		key = (start, finish, algorithm)
+		entry = self.entries.get(key)
+
+		if entry is None:
+			self.misses += 1
+			return None
+
+		version, result = entry
+
+		if version != grid.version:
+			if not still_valid(grid, version, result.path):
+				del self.entries[key]
+				self.misses += 1
+				return None
+
+			self.entries[key] = (grid.version, result)
+			self.revalidations += 1
+
+		self.entries.move_to_end(key)
+		self.hits += 1
+		return result
+
+	def put(self, grid, start, finish, algorithm, result):
+		key = (start, finish, algorithm)
+		self.entries[key] = (grid.version, result)
+		self.entries.move_to_end(key)
+
+		if len(self.entries) > self.capacity:
+			self.entries.popitem(last = False)
+			self.evictions += 1
+
+	def search(self, algorithm, grid, start, finish, visit = None):
+		# Runs a search from the search module on grid.model unless its
+		# result is cached. The visit callback only sees the cells of searches
+		# that actually run.
+		result = self.get(grid, start, finish, algorithm.__qualname__)
+
+		if result is None:
+			result = algorithm(grid.model, start, finish, *((visit,) if visit else ()))
+			self.put(grid, start, finish, algorithm.__qualname__, result)
+
+		return result
+
+	def clear(self):
+		self.entries.clear()
+
+	def __len__(self):
+		return len(self.entries)
+
+	def as_dict(self):
+		return {
+			"size": len(self.entries),
+			"capacity": self.capacity,
+			"hits": self.hits,
+			"misses": self.misses,
+			"evictions": self.evictions,
+			"revalidations": self.revalidations,
+		}
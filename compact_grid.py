@@ -0,0 +1,335 @@
+from collections import deque
+from cache import PathCache, EDIT_LOG_SIZE, log_edits
+from components import Components
+import map_io
+import landmarks
+from array import array
+from search import DIRECTIONS, MAX_STAMP, UNREACHED, neighbor_offsets, update_ring
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# Values of the state array
+EMPTY = 0
+WALL = 1
+START = 2
+FINISH = 3
+VISITED = 4
+SHORTEST_PATH = 5
+
+# Characters used by __str__, matching Grid.__str__
+SYMBOLS = {EMPTY: '.', WALL: '-', START: 'R', FINISH: 'G', VISITED: '.', SHORTEST_PATH: '.'}
+
+class CompactGrid:
+	def __init__(self, rows, cols):
+		# Array backed grid without a Cell object per tile. Every table is
+		# indexed by the flat index row * cols + col.
+		if np is None:
+			raise ImportError("CompactGrid requires numpy")
+
+		self.rows = rows
+		self.cols = cols
+		self.start = None
+		self.finish = None
+
+		# Edit counter and recent edits, see Grid
+		self.version = 0
+		self.edits = deque(maxlen = EDIT_LOG_SIZE)
+		self.path_cache = PathCache()
+
+		# Planner, cluster graph and landmark tables of the last LPA*, HPA* and
+		# ALT A* searches, see Grid
+		self.planner = None
+		self.needs_replan = False
+		self.hierarchy = None
+		self.landmarks = None
+
+		size = rows * cols
+		self.state = np.zeros(size, dtype = np.uint8)
+		self.step_costs = np.ones(size, dtype = np.uint8)
+		self.parents = np.full(size, -1, dtype = np.int32)
+		self.g = np.full(size, UNREACHED, dtype = np.int32)
+
+		# Generation stamps of the parent and g tables, see SearchGrid
+		self.stamps = np.zeros(size, dtype = np.uint32)
+		self.generation = 0
+		self.backward = None
+
+		# Cells marked as visited or on the path since the last clear_path
+		self.touched = array('i')
+
+		# 8-bit mask of the passable neighbors of every cell, see SearchGrid
+		self.passability = np.zeros(size, dtype = np.uint8)
+		self.offsets = neighbor_offsets(cols)
+
+		# Memoryviews index faster than the arrays themselves in the search
+		# loops, and give plain ints, so path costs do not wrap around at 255
+		self._state = memoryview(self.state)
+		self._parents = memoryview(self.parents)
+		self._g = memoryview(self.g)
+		self._stamps = memoryview(self.stamps)
+		self.adjacency = memoryview(self.passability)
+		self.costs = memoryview(self.step_costs)
+
+		self.rebuild_adjacency()
+		self.components = Components(self)
+
+	@property
+	def model(self):
+		# The compact grid is its own search map
+		return self
+
+	@property
+	def walls(self):
+		return self.state == WALL
+
+	def index(self, row, col):
+		return row * self.cols + col
+
+	def coords(self, index):
+		return divmod(index, self.cols)
+
+	def is_wall(self, coords):
+		return self._state[self.index(*coords)] == WALL
+
+	def is_empty(self, coords):
+		return self._state[self.index(*coords)] == EMPTY
+
+	def set_wall(self, coords, wall = True):
+		self.set_state(self.index(*coords), WALL if wall else EMPTY)
+
+	def set_walls(self, cells, wall = True):
+		# Changes many cells at once, see SearchGrid
+		indices = np.array([self.index(*coords) for coords in cells], dtype = np.int64)
+		indices = indices[(self.state[indices] == WALL) != wall]
+		self.state[indices] = WALL if wall else EMPTY
+
+		if len(indices) > self.rows * self.cols // 8:
+			self.rebuild_adjacency()
+		else:
+			for index in indices.tolist():
+				update_ring(self.adjacency, self.rows, self.cols, index, not wall)
+
+	def set_state(self, index, value):
+		# Changes the state of a cell, updating the masks of its ring when it
+		# becomes or stops being a wall
+		was_wall = self._state[index] == WALL
+		self._state[index] = value
+
+		if was_wall != (value == WALL):
+			update_ring(self.adjacency, self.rows, self.cols, index, value != WALL)
+
+	def rebuild_adjacency(self):
+		# Computes every mask at once by shifting the passable cells in each direction
+		free = (self.state != WALL).reshape(self.rows, self.cols).astype(np.uint8)
+		masks = self.passability.reshape(self.rows, self.cols)
+		masks.fill(0)
+
+		for bit, (dr, dc) in enumerate(DIRECTIONS):
+			neighbors = free[max(dr, 0):self.rows + min(dr, 0), max(dc, 0):self.cols + min(dc, 0)]
+			masks[max(-dr, 0):self.rows + min(-dr, 0), max(-dc, 0):self.cols + min(-dc, 0)] |= neighbors << bit
+
+	def search_tables(self):
+		# Starts a new search, see SearchGrid.search_tables
+		self.generation += 2
+
+		if self.generation + 1 > MAX_STAMP:
+			self.stamps.fill(0)
+			if self.backward:
+				self.backward[2].obj.fill(0)
+
+			self.generation = 2
+
+		return self._parents, self._g, self._stamps, self.generation
+
+	def backward_tables(self):
+		if self.backward is None:
+			size = self.rows * self.cols
+			self.backward = (memoryview(np.full(size, -1, dtype = np.int32)),
+				memoryview(np.full(size, UNREACHED, dtype = np.int32)), memoryview(np.zeros(size, dtype = np.uint32)))
+
+		return self.backward
+
+	def reached(self, index):
+		return self._stamps[index] >= self.generation
+
+	def get_adjacent(self, index):
+		# Finds the flat indices of the adjacent cells that are not walls
+		return [index + delta for delta in self.offsets[self.adjacency[index]]]
+
+	def bump_version(self, coords = None, wall = None):
+		log_edits(self, [coords], wall)
+
+	def record_edits(self, cells, wall):
+		# Records edits of many cells as a single version, see Grid
+		log_edits(self, cells, wall)
+
+	def walls_changed(self, cells):
+		# Tells the incremental planner and the cluster graph that cells
+		# became or stopped being walls, see Grid
+		if self.planner:
+			for coords in cells:
+				self.planner.update_cell(coords)
+
+			self.needs_replan = True
+
+		if self.hierarchy:
+			if len(cells) > len(self.hierarchy.intra):
+				self.hierarchy = None
+			else:
+				self.hierarchy.update_cells(cells)
+
+	def edit_cells(self, cells, wall):
+		# Makes cells walls, or empties the walls among them, as one edit.
+		# The start and finish cells are left as they are.
+		if wall:
+			changed = [coords for coords in cells if coords not in (self.start, self.finish) and not self.is_wall(coords)]
+		else:
+			changed = [coords for coords in cells if self.is_wall(coords)]
+
+		if changed:
+			self.set_walls(changed, wall)
+			self.walls_changed(changed)
+			self.record_edits(changed, wall)
+
+	def place_start(self, coords, pos = None):
+		self.set_state(self.index(*coords), START)
+		self.start = coords
+		self.bump_version(coords)
+
+	def place_finish(self, coords, pos = None):
+		self.set_state(self.index(*coords), FINISH)
+		self.finish = coords
+		self.bump_version(coords)
+
+	def place_obstacle(self, coords, pos = None):
+		if not self.is_wall(coords):
+			self.set_wall(coords)
+			self.walls_changed([coords])
+			self.bump_version(coords, True)
+
+	def remove(self, coords, pos = None):
+		# Removes the cell at the specified location
+		if coords == self.start:
+			self.start = None
+		elif coords == self.finish:
+			self.finish = None
+
+		was_wall = self.is_wall(coords)
+		self.set_state(self.index(*coords), EMPTY)
+
+		if was_wall:
+			self.walls_changed([coords])
+
+		self.bump_version(coords, False if was_wall else None)
+
+	def handle(self, coords, obstacle):
+		# Edits a cell the way a click on Grid does: obstacles are placed on
+		# any cell but the start and finish, otherwise an empty cell becomes
+		# the start or the finish and any other cell is removed
+		if obstacle:
+			if coords not in (self.start, self.finish):
+				self.place_obstacle(coords)
+		elif not self.is_empty(coords):
+			self.remove(coords)
+		elif not self.start:
+			self.place_start(coords)
+		elif not self.finish:
+			self.place_finish(coords)
+		else:
+			self.remove(self.start)
+			self.remove(self.finish)
+			self.place_start(coords)
+
+	def save_map(self, filename):
+		map_io.save(filename, self, self.start, self.finish)
+
+		# Tables of the last ALT A* search are saved next to the map, and
+		# used again once it is loaded
+		if self.landmarks and self.landmarks.is_current(self):
+			self.landmarks.save(landmarks.landmark_file(filename))
+
+	def load_map(self, filename):
+		# Replaces the walls, start and finish cells with those of a saved map
+		# of the same size
+		map_file = map_io.MapFile(filename)
+
+		if (map_file.rows, map_file.cols) != (self.rows, self.cols):
+			print("{} is {}x{}, the grid is {}x{}".format(filename, map_file.rows, map_file.cols, self.rows, self.cols))
+			map_file.close()
+			return
+
+		walls = map_file.walls()
+		start, finish = map_file.start, map_file.finish
+		map_file.close()
+
+		self.load_walls(walls, start, finish)
+
+	def load_walls(self, walls, start = None, finish = None):
+		# Replaces the walls with the flags of walls, one per cell in the
+		# order of the flat indices, and places the start and finish cells.
+		# Clearing is recorded as removing every wall, so the cache and the
+		# regions are rebuilt from the walls loaded here.
+		self.clear()
+		self.state[np.frombuffer(bytes(walls), dtype = np.uint8).astype(bool)] = WALL
+		self.rebuild_adjacency()
+
+		if start:
+			self.place_start(start)
+
+		if finish:
+			self.place_finish(finish)
+
+	def visit(self, row, col, color = None):
+		# Marks an empty cell as visited
+		index = row * self.cols + col
+
+		if self._state[index] == EMPTY:
+			self._state[index] = VISITED
+			self.touched.append(index)
+
+	def mark_path(self, coords):
+		index = self.index(*coords)
+
+		if self._state[index] in (EMPTY, VISITED):
+			self._state[index] = SHORTEST_PATH
+			self.touched.append(index)
+
+	def draw_path(self, path):
+		for coords in path[1:-1]:
+			self.mark_path(coords)
+
+	def clear_path(self):
+		# Removes the visited and shortest path marks, looking only at the
+		# cells that were marked
+		touched = np.frombuffer(self.touched, dtype = np.int32)
+		marks = self.state[touched]
+		self.state[touched[(marks == VISITED) | (marks == SHORTEST_PATH)]] = EMPTY
+		self.touched = array('i')
+
+	def clear(self):
+		# Resets the grid
+		self.state.fill(EMPTY)
+		self.touched = array('i')
+		self.rebuild_adjacency()
+		self.start = None
+		self.finish = None
+		self.planner = None
+		self.needs_replan = False
+		self.hierarchy = None
+		self.bump_version(None, False)
+
+	def nbytes(self):
+		# Memory used by the tables, in bytes
+		return self.state.nbytes + self.step_costs.nbytes + self.parents.nbytes + self.g.nbytes + self.stamps.nbytes
+
+	def __str__(self):
+		rows = []
+
+		for r in range(self.rows):
+			offset = r * self.cols
+			rows.append(''.join(SYMBOLS[value] for value in self._state[offset:offset + self.cols]))
+
+		return '\n'.join(rows) + '\n'
@@ -0,0 +1,198 @@
+import multiprocessing
+import queue
+import tracemalloc
+from time import perf_counter
+import pygame
+from constants import *
+from search import SearchGrid
+from instrumentation import format_time
+
+# Pixels between two panes and height of the stats below every pane
+PANE_GAP = 10
+PANE_INFO_HEIGHT = 80
+
+# Widest the comparison window gets, the tiles shrink to fit
+MAX_COMPARE_WIDTH = 1800
+
+def run_worker(pane, name, rows, cols, walls, costs, start, finish, messages):
+	# Runs in its own process: searches a copy of the map and reports the
+	# cells it expands, its timing and its peak traced memory about once a
+	# frame, then the path once it is done
+	from benchmark import ALGORITHMS
+
+	grid = SearchGrid(rows, cols)
+	grid.load_walls(walls)
+	grid.costs[:] = costs
+
+	batch = []
+	expanded = [0]
+	reported = [perf_counter()]
+
+	def visit(row, col, *args):
+		batch.append(row * cols + col)
+		expanded[0] += 1
+		now = perf_counter()
+
+		if now - reported[0] >= 1 / FPS:
+			messages.put(('progress', pane, batch[:], expanded[0], now - started, tracemalloc.get_traced_memory()[1]))
+			batch.clear()
+			reported[0] = now
+
+	tracemalloc.start()
+	started = perf_counter()
+
+	algorithm = ALGORITHMS[name]
+	if name.startswith("Bidirectional"):
+		result = algorithm(grid, start, finish, visit, visit)
+	else:
+		result = algorithm(grid, start, finish, visit)
+
+	elapsed = perf_counter() - started
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	messages.put(('done', pane, batch, result.expanded, elapsed, peak, result.path, result.cost))
+
+class Pane:
+	def __init__(self, name, origin, tile_size):
+		# One algorithm's view of the map and its latest numbers
+		self.name = name
+		self.origin = origin
+		self.tile_size = tile_size
+		self.expanded = 0
+		self.elapsed = 0.0
+		self.peak_memory = 0
+		self.done = False
+		self.cost = None
+
+	def rect(self, row, col):
+		x, y = self.origin
+		return pygame.Rect(x + col * self.tile_size + 1, y + row * self.tile_size + 1, self.tile_size - 1, self.tile_size - 1)
+
+	def fill(self, window, cells, color):
+		return [window.fill(color, self.rect(row, col)) for row, col in cells]
+
+	def draw_map(self, window, grid, start, finish):
+		x, y = self.origin
+		width = grid.cols * self.tile_size
+		height = grid.rows * self.tile_size
+		window.fill(GRID, (x, y, width + 1, height + 1))
+		window.fill(BLACK, (x + 1, y + 1, width - 1, height - 1))
+
+		for row in range(grid.rows):
+			for col in range(grid.cols):
+				color = WALLS if grid.is_wall((row, col)) else BLACK
+				window.fill(color, self.rect(row, col))
+
+		self.fill(window, [start], RED)
+		self.fill(window, [finish], GREEN)
+
+	def draw_path(self, window, path):
+		x, y = self.origin
+		half = self.tile_size // 2
+		points = [(x + col * self.tile_size + half, y + row * self.tile_size + half) for row, col in path]
+
+		self.fill(window, path[1:-1], FINAL_PATH)
+		if len(points) > 1:
+			pygame.draw.lines(window, LINE_PATH, False, points, 2)
+
+	def draw_info(self, window, font, top, width):
+		area = pygame.Rect(self.origin[0], top, width, PANE_INFO_HEIGHT)
+		window.fill(BLACK, area)
+
+		if self.done:
+			outcome = 'Cost: {}'.format(self.cost) if self.cost != float('inf') else 'Path not found'
+		else:
+			outcome = 'Searching...'
+
+		lines = [self.name + '   ' + outcome, 'Expanded: {}   Time: {}'.format(self.expanded, format_time(self.elapsed)),
+			'Memory: {:.1f} KiB'.format(self.peak_memory / 1024)]
+
+		for i, line in enumerate(lines):
+			window.blit(font.render(line, True, WHITE), (area.x, area.y + 5 + i * 24))
+
+		return area
+
+def compare(names, grid, start, finish, tile_size):
+	# Runs every algorithm in names on the map at the same time, each in its
+	# own process, and shows them side by side. Returns False if the window
+	# was closed, True once the comparison is left with escape.
+	from benchmark import ALGORITHMS
+
+	# The workers only know the searches of the benchmark, so names from the
+	# start screen such as LPA* are left out instead of failing in a worker
+	unknown = [name for name in names if name not in ALGORITHMS]
+	if unknown:
+		print("Cannot compare {}, the algorithms that can be compared are {}".format(', '.join(unknown), ', '.join(ALGORITHMS)))
+		names = [name for name in names if name in ALGORITHMS]
+
+	if not names:
+		return True
+
+	count = len(names)
+	tile = max(2, min(tile_size, (MAX_COMPARE_WIDTH - PANE_GAP * (count - 1)) // (count * grid.cols)))
+	pane_width = grid.cols * tile + 1
+	pane_height = grid.rows * tile + 1
+
+	window = pygame.display.set_mode((count * pane_width + (count - 1) * PANE_GAP, pane_height + PANE_INFO_HEIGHT))
+	window.fill(BLACK)
+	font = pygame.font.SysFont("arial", 18)
+	clock = pygame.time.Clock()
+
+	panes = [Pane(name, (i * (pane_width + PANE_GAP), 0), tile) for i, name in enumerate(names)]
+	for pane in panes:
+		pane.draw_map(window, grid, start, finish)
+	pygame.display.update()
+
+	# Visit colors only apply to open cells, so start and finish stay visible
+	skip = {start, finish}
+	messages = multiprocessing.Queue()
+	walls = bytes(grid.walls)
+	costs = bytes(grid.costs)
+	workers = [multiprocessing.Process(target = run_worker, daemon = True,
+		args = (i, name, grid.rows, grid.cols, walls, costs, start, finish, messages)) for i, name in enumerate(names)]
+
+	for worker in workers:
+		worker.start()
+
+	result = None
+	while result is None:
+		for event in pygame.event.get():
+			if event.type == pygame.QUIT:
+				result = False
+			elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+				result = True
+
+		dirty = []
+
+		# Applies every message that arrived since the last frame
+		while True:
+			try:
+				message = messages.get_nowait()
+			except queue.Empty:
+				break
+
+			kind, i, visits = message[:3]
+			pane = panes[i]
+			cells = [divmod(index, grid.cols) for index in visits]
+			dirty += pane.fill(window, [cell for cell in cells if cell not in skip], PATH)
+
+			if kind == 'progress':
+				pane.expanded, pane.elapsed, pane.peak_memory = message[3:]
+			else:
+				pane.expanded, pane.elapsed, pane.peak_memory, path, pane.cost = message[3:]
+				pane.done = True
+				pane.draw_path(window, path)
+				dirty.append(pygame.Rect(pane.origin, (pane_width, pane_height)))
+
+		for pane in panes:
+			dirty.append(pane.draw_info(window, font, pane_height, pane_width))
+
+		pygame.display.update(dirty)
+		clock.tick(FPS)
+
+	for worker in workers:
+		if worker.is_alive():
+			worker.terminate()
+
+	return result
@@ -0,0 +1,233 @@
+from array import array
+from collections import deque
+from search import DIRECTIONS
+from cache import edits_since
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# Label of the cells that are walls
+WALL = -1
+
+class Components:
+	def __init__(self, grid):
+		# Connected regions of the open cells of a grid, so a query whose start
+		# and finish are in different regions can be answered without
+		# searching. Every open cell has a label, and labels of regions that
+		# were joined by removing a wall are merged with union-find. The labels
+		# follow the edits recorded by the grid, so they are brought up to date
+		# only when asked, by looking at the cells edited since. Nothing is
+		# labeled until the first query.
+		self.rows = grid.rows
+		self.cols = grid.cols
+		self.version = grid.version
+		self.labels = None
+		self.parents = []
+
+	def relabel(self, grid):
+		# Labels every region again from the walls of the grid
+		self.rows = grid.rows
+		self.cols = grid.cols
+		self.version = grid.version
+		walls = bytes(grid.model.walls)
+
+		if np is not None:
+			labels, count = label_regions(walls, self.rows, self.cols)
+			self.labels = array('i', labels.tobytes())
+			self.parents = list(range(count))
+			return
+
+		self.labels = array('i', [WALL]) * (grid.rows * grid.cols)
+		self.parents = []
+		index = walls.find(b'\0')
+
+		while index >= 0:
+			if self.labels[index] == WALL:
+				self.flood(index, walls)
+
+			index = walls.find(b'\0', index + 1)
+
+	def flood(self, source, walls = None):
+		# Gives a new label to the region of source. Without walls the open
+		# cells are the ones that have a label.
+		labels = self.labels
+		label = len(self.parents)
+		self.parents.append(label)
+
+		labels[source] = label
+		queue = deque([source])
+
+		while queue:
+			current = queue.popleft()
+
+			for neighbor in self.neighbors(current):
+				if labels[neighbor] != label and (labels[neighbor] != WALL if walls is None else not walls[neighbor]):
+					labels[neighbor] = label
+					queue.append(neighbor)
+
+	def neighbors(self, index):
+		row, col = divmod(index, self.cols)
+
+		for dr, dc in DIRECTIONS:
+			r = row + dr
+			c = col + dc
+
+			if 0 <= r < self.rows and 0 <= c < self.cols:
+				yield r * self.cols + c
+
+	def find(self, label):
+		parents = self.parents
+
+		while parents[label] != label:
+			parents[label] = parents[parents[label]]
+			label = parents[label]
+
+		return label
+
+	def add_wall(self, index):
+		# A wall can only split its region if the open cells around it are
+		# not joined to each other without it. If they are not, every group
+		# of them but the first gets its region labeled again.
+		self.labels[index] = WALL
+		around = [neighbor for neighbor in self.neighbors(index) if self.labels[neighbor] != WALL]
+		groups = []
+
+		while around:
+			group = [around.pop()]
+
+			for cell in group:
+				row, col = divmod(cell, self.cols)
+				joined = [other for other in around if abs(other // self.cols - row) <= 1 and abs(other % self.cols - col) <= 1]
+				group += joined
+				around = [other for other in around if other not in joined]
+
+			groups.append(group)
+
+		relabeled = set()
+		for group in groups[1:]:
+			if self.labels[group[0]] not in relabeled:
+				self.flood(group[0])
+				relabeled.add(self.labels[group[0]])
+
+	def remove_wall(self, index):
+		# An open cell joins the regions around it
+		roots = {self.find(self.labels[neighbor]) for neighbor in self.neighbors(index) if self.labels[neighbor] != WALL}
+
+		if not roots:
+			self.parents.append(len(self.parents))
+			self.labels[index] = len(self.parents) - 1
+			return
+
+		label = roots.pop()
+		for root in roots:
+			self.parents[root] = label
+
+		self.labels[index] = label
+
+	def update(self, grid):
+		# Applies the edits made to the grid since the labels were last updated
+		edits = edits_since(grid, self.version)
+
+		if edits is None or self.labels is None or (grid.rows, grid.cols) != (self.rows, self.cols):
+			self.relabel(grid)
+			return
+
+		for version, coords, wall in edits:
+			if wall is None:
+				continue
+
+			# Clearing the grid is recorded without a cell
+			if coords is None:
+				self.relabel(grid)
+				return
+
+			index = coords[0] * self.cols + coords[1]
+
+			if wall and self.labels[index] != WALL:
+				self.add_wall(index)
+			elif not wall and self.labels[index] == WALL:
+				self.remove_wall(index)
+
+		self.version = grid.version
+
+	def connected(self, grid, start, finish):
+		# Whether a path can join start and finish
+		self.update(grid)
+		start = self.labels[start[0] * self.cols + start[1]]
+		finish = self.labels[finish[0] * self.cols + finish[1]]
+
+		return start != WALL and finish != WALL and self.find(start) == self.find(finish)
+
+def label_regions(walls, rows, cols):
+	# Labels the regions of the open cells with whole-array operations.
+	# Every run of open cells along a row starts as one region, rooted at its
+	# first cell. Runs of neighboring rows are joined by one edge per place
+	# they touch, and each round hooks the larger root of every edge between
+	# two regions to the smaller one, points the roots of the round straight
+	# at their new root and drops the edges inside a region. Returns the
+	# int32 labels, WALL for walls, and the number of regions.
+	size = rows * cols
+	free = np.frombuffer(walls, dtype = np.uint8).reshape(rows, cols) == 0
+	cells = np.arange(size, dtype = np.int32).reshape(rows, cols)
+
+	starts = free.copy()
+	starts[:, 1:] &= ~free[:, :-1]
+	parents = np.maximum.accumulate(np.where(starts, cells, 0).ravel())
+
+	# Runs of two rows touch where cells are open one above the other, and
+	# only the first cell of every such stretch needs an edge. A diagonal
+	# step joins two runs no other edge joins only if it squeezes between
+	# two walls.
+	below = free[:-1] & free[1:]
+	below[:, 1:] &= ~below[:, :-1]
+	right = free[:-1, :-1] & free[1:, 1:] & ~free[1:, :-1] & ~free[:-1, 1:]
+	left = free[:-1, 1:] & free[1:, :-1] & ~free[1:, 1:] & ~free[:-1, :-1]
+
+	first = parents[np.concatenate((cells[:-1][below], cells[:-1, :-1][right], cells[:-1, 1:][left]))]
+	second = parents[np.concatenate((cells[1:][below], cells[1:, 1:][right], cells[1:, :-1][left]))]
+	active = np.zeros(size, dtype = bool)
+
+	while True:
+		apart = first != second
+		first = first[apart]
+		second = second[apart]
+
+		if not first.size:
+			break
+
+		# Roots only ever point to smaller ones, so no cycle can form
+		parents[np.maximum(first, second)] = np.minimum(first, second)
+
+		active[first] = True
+		active[second] = True
+		roots = np.flatnonzero(active)
+		active[roots] = False
+
+		while True:
+			grandparents = parents[parents[roots]]
+			if np.array_equal(grandparents, parents[roots]):
+				break
+
+			parents[roots] = grandparents
+
+		first = parents[first]
+		second = parents[second]
+
+	# Cells hooked in earlier rounds point at roots of their round, so a
+	# few passes over the whole table reach the final roots
+	while True:
+		grandparents = parents[parents]
+		if np.array_equal(grandparents, parents):
+			break
+
+		parents = grandparents
+
+	# Numbers the roots of the open cells from 0
+	free = free.ravel()
+	roots = free & (parents == cells.ravel())
+	numbers = np.cumsum(roots, dtype = np.int32) - 1
+	labels = np.where(free, numbers[parents], np.int32(WALL)).astype(np.int32)
+
+	return labels, int(roots.sum())
@@ -1,6 +1,28 @@
 # FPS
 FPS = 60
 
+# Number of dirty areas above which a frame redraws the whole window
+MAX_DIRTY_RECTS = 256
+
+# Opt-in profiling of the searches run from the visualizer. The cProfile
+# report is printed and the tracemalloc peak is kept in the run's stats.
+PROFILE_CPU = False
+TRACE_MEMORY = False
+
+# File the last search is saved to when 't' is pressed
+TRACE_FILE = "last_run.trace"
+
+# File the map is saved to with 's' and loaded from with 'l'
+MAP_FILE = "map.pfmap"
+
+# Grids with more cells than this are drawn through a viewport that can be
+# panned and zoomed, in a window of at most VIEWPORT_SIZE pixels
+LARGE_GRID = 100 * 100
+VIEWPORT_SIZE = (1000, 800)
+
+# Algorithms run side by side when 'm' is pressed
+COMPARE_ALGORITHMS = ["BFS", "Dijkstras", "A*"]
+
 # Colors
 WHITE = (255, 255, 255)
 GREEN = (0, 255, 0,)
@@ -18,6 +40,8 @@ LIGHT_RED = (250,128,114)
 # Colors of game elements
 WALLS = GRAY
 PATH = BLUE
+FORWARD_PATH = LIGHT_RED
+BACKWARD_PATH = LIGHT_GREEN
 GRID = WHITE
 FINAL_PATH = PURPLE
 LINE_PATH = ORANGE
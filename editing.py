@@ -0,0 +1,69 @@
+from collections import deque
+from search import DIRECTIONS
+
+# Steps of the flood fill over walls. A wall line only has to be joined
+# through the sides of its cells to block the searches, which also move
+# diagonally, so walls are filled through the sides and open cells through
+# the corners too.
+SIDES = ((1, 0), (0, -1), (-1, 0), (0, 1))
+
+def line(start, end):
+	# Cells of a stroke from start to end, every one sharing a side with the
+	# one before. A stroke with diagonal steps would leave gaps the searches
+	# could slip through.
+	row, col = start
+	end_row, end_col = end
+	rows = abs(end_row - row)
+	cols = abs(end_col - col)
+	step_row = 1 if end_row > row else -1
+	step_col = 1 if end_col > col else -1
+
+	cells = [(row, col)]
+	error = cols - rows
+
+	for i in range(rows + cols):
+		# Moves along the axis that keeps the stroke closest to the line
+		if error > 0 or (error == 0 and cols >= rows):
+			col += step_col
+			error -= 2 * rows
+		else:
+			row += step_row
+			error += 2 * cols
+
+		cells.append((row, col))
+
+	return cells
+
+def rectangle(corner, other):
+	# Cells of the rectangle with the two cells as opposite corners
+	top, bottom = sorted((corner[0], other[0]))
+	left, right = sorted((corner[1], other[1]))
+
+	return [(row, col) for row in range(top, bottom + 1) for col in range(left, right + 1)]
+
+def flood(grid, origin):
+	# Region of a search grid around origin: the open cells that can be
+	# reached from it, or the walls joined to it by their sides
+	rows = grid.rows
+	cols = grid.cols
+	walls = bytes(grid.walls)
+	index = origin[0] * cols + origin[1]
+	wall = walls[index]
+	steps = SIDES if wall else DIRECTIONS
+
+	region = {index}
+	queue = deque([origin])
+
+	while queue:
+		row, col = queue.popleft()
+
+		for dr, dc in steps:
+			r = row + dr
+			c = col + dc
+			neighbor = r * cols + c
+
+			if 0 <= r < rows and 0 <= c < cols and neighbor not in region and walls[neighbor] == wall:
+				region.add(neighbor)
+				queue.append((r, c))
+
+	return [divmod(index, cols) for index in region]
@@ -0,0 +1,271 @@
+import random
+import wavefront
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# Fraction of walls of the random maps and of the caves before they are smoothed
+RANDOM_DENSITY = 0.3
+CAVE_FILL = 0.45
+
+# Smoothing steps of the caves. A cell becomes a wall when at least
+# CAVE_WALLS of the nine cells around and including it are walls.
+CAVE_STEPS = 5
+CAVE_WALLS = 5
+
+# Smallest and largest side of the rooms
+ROOM_SIZE = (4, 12)
+
+# Cells sampled when looking for the largest region of a map
+PLACEMENT_TRIES = 8
+
+class GeneratedMap:
+	def __init__(self, walls, start = None, finish = None):
+		# A generated map: a (rows, cols) array of walls, 1 for a wall, and a
+		# start and finish cell joined by a path, or None if the map has no
+		# open cell. walls is also kept flat, like the walls of a SearchGrid.
+		self.rows, self.cols = walls.shape
+		self.grid_walls = walls
+		self.walls = walls.ravel()
+		self.start = start
+		self.finish = finish
+
+	def load(self, grid):
+		# Replaces the walls, start and finish cells of a Grid or CompactGrid
+		grid.load_walls(self.walls, self.start, self.finish)
+
+def require_numpy():
+	if np is None:
+		raise ImportError("the map generators require numpy")
+
+def coords(index, cols):
+	row, col = divmod(int(index), cols)
+	return row, col
+
+def far_apart(generated, rng):
+	# Picks a start and finish in the largest region of the map, as far
+	# apart as two passes of breadth first search find: the finish is the
+	# cell farthest from the start, and the start the cell farthest from a
+	# cell of the region. The region is found by searching from a few random
+	# open cells until one reaches more than half of them.
+	open_cells = np.flatnonzero(generated.walls == 0)
+	if not open_cells.size:
+		return None, None
+
+	best = None
+	for i in range(PLACEMENT_TRIES):
+		distances = wavefront.distance_field(generated, coords(open_cells[rng.integers(open_cells.size)], generated.cols))
+		reached = np.count_nonzero(distances >= 0)
+
+		if best is None or reached > best[0]:
+			best = (reached, distances)
+
+		if reached * 2 > open_cells.size:
+			break
+
+	start = coords(np.argmax(best[1]), generated.cols)
+	finish = coords(np.argmax(wavefront.distance_field(generated, start)), generated.cols)
+
+	return start, finish
+
+def random_obstacles(rows, cols, seed = None, density = RANDOM_DENSITY):
+	# Every cell is a wall with the given probability
+	require_numpy()
+	rng = np.random.default_rng(seed)
+
+	generated = GeneratedMap((rng.random((rows, cols)) < density).astype(np.uint8))
+	generated.start, generated.finish = far_apart(generated, rng)
+
+	return generated
+
+def maze_cells(rows, cols):
+	# Rows and columns of maze cells: every cell of the maze is an open cell
+	# at odd coordinates, and the cells between two of them are opened to
+	# join them
+	return max((rows - 1) // 2, 1), max((cols - 1) // 2, 1)
+
+def carve(rows, cols, links, height, width):
+	# Walls of a maze whose joined cells are the pairs of links
+	walls = np.ones((rows, cols), dtype = np.uint8)
+	walls[1:2 * height:2, 1:2 * width:2] = 0
+
+	if links:
+		pairs = np.array(links, dtype = np.int64)
+		first_rows, first_cols = np.divmod(pairs[:, 0], width)
+		second_rows, second_cols = np.divmod(pairs[:, 1], width)
+		walls[first_rows + second_rows + 1, first_cols + second_cols + 1] = 0
+
+	generated = GeneratedMap(walls)
+
+	# Every cell of a perfect maze is joined to every other one, so the
+	# opposite corners always make a solvable query
+	generated.start = (1, 1)
+	generated.finish = (2 * height - 1, 2 * width - 1)
+
+	return generated
+
+def maze_neighbors(cell, height, width):
+	row, col = divmod(cell, width)
+	neighbors = []
+
+	if row > 0:
+		neighbors.append(cell - width)
+	if row < height - 1:
+		neighbors.append(cell + width)
+	if col > 0:
+		neighbors.append(cell - 1)
+	if col < width - 1:
+		neighbors.append(cell + 1)
+
+	return neighbors
+
+def backtracker_maze(rows, cols, seed = None):
+	# Maze dug by a random depth first walk that backs up at dead ends,
+	# which gives long winding corridors. Every step depends on the one
+	# before, so the walk itself is a plain loop and only the walls are
+	# written at once.
+	require_numpy()
+	rng = random.Random(seed)
+	height, width = maze_cells(rows, cols)
+
+	visited = bytearray(height * width)
+	visited[0] = 1
+	stack = [0]
+	links = []
+	choose = rng.random
+	last_row = (height - 1) * width
+
+	while stack:
+		cell = stack[-1]
+		col = cell % width
+
+		# Neighbors not dug yet, checked inline since this loop runs once per cell
+		options = []
+		if cell >= width and not visited[cell - width]:
+			options.append(cell - width)
+		if cell < last_row and not visited[cell + width]:
+			options.append(cell + width)
+		if col and not visited[cell - 1]:
+			options.append(cell - 1)
+		if col < width - 1 and not visited[cell + 1]:
+			options.append(cell + 1)
+
+		if not options:
+			stack.pop()
+			continue
+
+		neighbor = options[int(choose() * len(options))]
+		visited[neighbor] = 1
+		links.append((cell, neighbor))
+		stack.append(neighbor)
+
+	return carve(rows, cols, links, height, width)
+
+def prim_maze(rows, cols, seed = None):
+	# Maze grown by randomized Prim's algorithm: every step joins a random
+	# cell next to the maze, which gives many short dead ends
+	require_numpy()
+	rng = random.Random(seed)
+	height, width = maze_cells(rows, cols)
+
+	visited = bytearray(height * width)
+	visited[0] = 1
+	frontier = [(0, neighbor) for neighbor in maze_neighbors(0, height, width)]
+	links = []
+	choose = rng.random
+	last_row = (height - 1) * width
+
+	while frontier:
+		# Removes a random entry by swapping it with the last one
+		i = int(choose() * len(frontier))
+		frontier[i], frontier[-1] = frontier[-1], frontier[i]
+		cell, neighbor = frontier.pop()
+
+		if visited[neighbor]:
+			continue
+
+		visited[neighbor] = 1
+		links.append((cell, neighbor))
+
+		# Neighbors checked inline, see backtracker_maze
+		col = neighbor % width
+		if neighbor >= width and not visited[neighbor - width]:
+			frontier.append((neighbor, neighbor - width))
+		if neighbor < last_row and not visited[neighbor + width]:
+			frontier.append((neighbor, neighbor + width))
+		if col and not visited[neighbor - 1]:
+			frontier.append((neighbor, neighbor - 1))
+		if col < width - 1 and not visited[neighbor + 1]:
+			frontier.append((neighbor, neighbor + 1))
+
+	return carve(rows, cols, links, height, width)
+
+def cave(rows, cols, seed = None, fill = CAVE_FILL, steps = CAVE_STEPS):
+	# Cellular automaton caves: random walls smoothed a few times, every
+	# cell taking the majority of the cells around it. Cells outside the
+	# map count as walls.
+	require_numpy()
+	rng = np.random.default_rng(seed)
+	walls = rng.random((rows, cols)) < fill
+
+	for i in range(steps):
+		padded = np.pad(walls, 1, constant_values = True)
+		count = np.zeros((rows, cols), dtype = np.uint8)
+
+		for dr in range(3):
+			for dc in range(3):
+				count += padded[dr:dr + rows, dc:dc + cols]
+
+		walls = count >= CAVE_WALLS
+
+	generated = GeneratedMap(walls.astype(np.uint8))
+	generated.start, generated.finish = far_apart(generated, rng)
+
+	return generated
+
+def rooms(rows, cols, seed = None, count = None, room_size = ROOM_SIZE):
+	# Rectangular rooms joined by L shaped corridors. The rooms are chained
+	# in bands from top to bottom, each one joined to the next, so every
+	# room can be reached from the first.
+	require_numpy()
+	rng = np.random.default_rng(seed)
+	smallest = max(1, min(room_size[0], rows - 2, cols - 2))
+	largest = max(smallest, min(room_size[1], rows - 2, cols - 2))
+
+	if count is None:
+		count = max(2, rows * cols // (largest * largest * 4))
+
+	heights = rng.integers(smallest, largest + 1, count)
+	widths = rng.integers(smallest, largest + 1, count)
+	tops = rng.integers(1, np.maximum(rows - heights, 2))
+	lefts = rng.integers(1, np.maximum(cols - widths, 2))
+	center_rows = np.minimum(tops + heights // 2, rows - 2)
+	center_cols = np.minimum(lefts + widths // 2, cols - 2)
+
+	walls = np.ones((rows, cols), dtype = np.uint8)
+	for top, left, height, width in zip(tops.tolist(), lefts.tolist(), heights.tolist(), widths.tolist()):
+		walls[top:min(top + height, rows - 1), left:min(left + width, cols - 1)] = 0
+
+	order = np.lexsort((center_cols, center_rows // (largest * 4))).tolist()
+	centers = list(zip(center_rows.tolist(), center_cols.tolist()))
+
+	for first, second in zip(order, order[1:]):
+		(row, col), (other_row, other_col) = centers[first], centers[second]
+		walls[row, min(col, other_col):max(col, other_col) + 1] = 0
+		walls[min(row, other_row):max(row, other_row) + 1, other_col] = 0
+
+	return GeneratedMap(walls, centers[order[0]], centers[order[-1]])
+
+# Generators by name, all called as generator(rows, cols, seed, **options)
+GENERATORS = {
+	"random": random_obstacles,
+	"backtracker": backtracker_maze,
+	"prim": prim_maze,
+	"cave": cave,
+	"rooms": rooms,
+}
+
+def generate(name, rows, cols, seed = None, **options):
+	return GENERATORS[name](rows, cols, seed, **options)
@@ -1,32 +1,67 @@
-import sys
 import os
 import pygame
 import threading
+import random
+from collections import deque
+from time import perf_counter
 from constants import *
 from thread import Thread
-from pathfinding_algos import bfs, dfs, dijkstras, A_star
-
-def start_timer(thread):
-	start = pygame.time.get_ticks()
-
-	while thread.is_finding_path and thread.is_threading:
-		now = pygame.time.get_ticks()
-		elapsed = now - start
-
-		seconds, milliseconds = elapsed // 1000, elapsed % 1000
-
-		time = "{}:{:03d}".format(seconds, milliseconds)
-		display_time('Time: ' + time)
-
-	if not thread.path_exists:
-		display_time('Time: ' + 'Path not found')
-
-	thread.reset_path_exists()
+from pathfinding_algos import ALGORITHMS, bfs
+from search import SearchGrid
+from compact_grid import CompactGrid
+from visit_trace import Trace
+import map_io
+import landmarks
+from instrumentation import format_time
+from cache import PathCache, EDIT_LOG_SIZE, log_edits
+from components import Components
+from compare import compare
+from viewport import Viewport, PAN_STEP
+import editing
+import generators
+
+class RenderQueue:
+	def __init__(self):
+		# Areas of the window drawn since the last frame. Cells are drawn from
+		# the search thread, so the list is guarded by a lock.
+		self.rects = []
+		self.lock = threading.Lock()
+
+	def add(self, rect):
+		with self.lock:
+			self.rects.append(rect)
+
+	def flush(self):
+		# Updates only the dirty areas of the screen, once per frame
+		with self.lock:
+			rects = self.rects
+			self.rects = []
+
+		# A single full update is cheaper than a long list of small ones
+		if len(rects) > MAX_DIRTY_RECTS:
+			pygame.display.update()
+		elif rects:
+			pygame.display.update(rects)
+
+render_queue = RenderQueue()
+
+# Keys that replace the map with a generated one
+GENERATOR_KEYS = {pygame.K_1: "random", pygame.K_2: "backtracker", pygame.K_3: "prim", pygame.K_4: "cave", pygame.K_5: "rooms"}
+
+def generate_map(grid, name):
+	# Loads a generated map into a Grid or CompactGrid. The seed is printed so
+	# the same map can be made again with generators.generate.
+	seed = random.randrange(2 ** 32)
+	generators.generate(name, grid.rows, grid.cols, seed).load(grid)
+	print("Generated a {} map with seed {}".format(name, seed))
 
 def display_algorithm_text(text):
+	algorithm_rect = pygame.Rect(10, HEIGHT + 10, WIDTH - 10, 35)
+	window.fill(BLACK, algorithm_rect)
+
 	rendered_text = font.render(text, True, WHITE)
 	window.blit(rendered_text, [10, HEIGHT + 15])
-	pygame.display.update()
+	render_queue.add(algorithm_rect)
 
 def display_time(text):
 	timer_rect = pygame.Rect(10, HEIGHT + 45, WIDTH - 10, 50)
@@ -34,19 +69,55 @@ def display_time(text):
 
 	rendered_text = font.render(text, True, WHITE)
 	window.blit(rendered_text, [10, HEIGHT + 50])
-	pygame.display.update()
+	render_queue.add(timer_rect)
+
+def display_stats(stats):
+	# Shows the counters and the search and render times of a search
+	if stats.cached:
+		counters = 'Cached, nothing searched'
+	else:
+		counters = 'Expanded: {}'.format(stats.expansions)
+		if not stats.running:
+			counters += '   Pushes: {}   Duplicates: {}   Neighbors: {}'.format(stats.pushes,
+				stats.duplicate_pushes, stats.neighbor_calls)
+
+	display_algorithm_text('Algorithm: {}   {}'.format(algo, counters))
+	times = 'Time: {}   Search: {}   Render: {}'.format(format_time(stats.elapsed),
+		format_time(stats.search_time), format_time(stats.render_time))
+
+	if stats.build_time:
+		times += '   Build: ' + format_time(stats.build_time)
+
+	if stats.peak_memory is not None:
+		times += '   Memory: {:.1f} KiB'.format(stats.peak_memory / 1024)
+
+	display_time(times)
+
+def display_replan(result, elapsed):
+	# Shows how much work repairing the path took after the walls changed
+	display_algorithm_text('Algorithm: {}   Expanded: {}'.format(algo, result.expanded))
+
+	if result.found:
+		display_time('Replanned in: ' + format_time(elapsed))
+	else:
+		display_time('Time: ' + 'Path not found')
 
 def init_info_section(algorithm):
 	display_algorithm_text('Algorithm: ' + algorithm)
 	display_time('Time: 0:000')
 
-def init_grid(algorithm, rows, cols, tile_size):
-	# Creates the start window and initializes the grid
-	global window, WIDTH, HEIGHT, TILE_SIZE, font, clock, algo
+def init_window(rows, cols, tile_size):
+	# Creates the window for a grid of the given size
+	open_window(cols * tile_size + 1, rows * tile_size + 1, tile_size)
+
+def open_window(width, height, tile_size):
+	# Creates a window with width x height pixels for the grid and the info
+	# section below it
+	global window, WIDTH, HEIGHT, TILE_SIZE, font, clock
 
 	# Grid dimensions
-	WIDTH = rows * tile_size + 1
-	HEIGHT = cols * tile_size + 1
+	WIDTH = width
+	HEIGHT = height
 	DIMENSIONS = (WIDTH, HEIGHT + 80)
 	TILE_SIZE = tile_size
 
@@ -65,15 +136,66 @@ def init_grid(algorithm, rows, cols, tile_size):
 
 	clock = pygame.time.Clock()
 
+def restore_window(grid):
+	# Gives the window back to the grid after another screen resized it
+	global window
+
+	window = pygame.display.set_mode((WIDTH, HEIGHT + 80))
+	window.fill(BLACK)
+	grid.redraw()
+	init_info_section(algo)
+	render_queue.add(window.get_rect())
+
+def snapshot(grid):
+	# Size, walls, start and finish of a Grid or CompactGrid
+	return grid.rows, grid.cols, bytes(grid.model.walls), grid.start, grid.finish
+
+def restore(grid, saved):
+	# Loads a snapshot into a grid of the same size
+	rows, cols, walls, start, finish = saved
+
+	if (rows, cols) == (grid.rows, grid.cols):
+		grid.load_walls(walls, start, finish)
+
+def close_window(back_to_menu, grid):
+	# Ends a main loop. Going back to the menu only closes the window, so
+	# pygame stays loaded, and returns the map for the next grid.
+	if back_to_menu:
+		pygame.display.quit()
+		return snapshot(grid)
+
+	pygame.quit()
+
+def init_grid(algorithm, rows, cols, tile_size, saved = None):
+	# Creates the start window and initializes the grid, with the map of a
+	# snapshot if it has the same size. Returns a snapshot of the map when
+	# escape is pressed to go back to the menu, None when the window is closed.
+	global algo
+
+	if rows * cols > LARGE_GRID:
+		return init_viewport(algorithm, rows, cols, tile_size, saved)
+
+	init_window(rows, cols, tile_size)
+
 	algo = algorithm
 	
 	grid = Grid(HEIGHT//TILE_SIZE, WIDTH//TILE_SIZE)
 	grid.draw()
 
+	if saved:
+		restore(grid, saved)
+
 	place_obstacles = False
 	is_running = True
+	back_to_menu = False
+	reported = True
+
+	# Last cell of the stroke being drawn, and the first corner of the
+	# rectangle being dragged with shift held
+	last_cell = None
+	corner = None
 
-	thread = Thread()
+	thread = Thread(PROFILE_CPU, TRACE_MEMORY)
 
 	init_info_section(algorithm)
 
@@ -84,78 +206,424 @@ def init_grid(algorithm, rows, cols, tile_size):
 			if event.type == pygame.QUIT:
 				is_running = False
 			elif event.type == pygame.MOUSEBUTTONDOWN:
-				if thread.is_threading or thread.finished_state:
+				# Walls can still be edited after an incremental search
+				if thread.is_threading or (thread.finished_state and not grid.planner):
 					continue
 				
-				if event.button == 3:
-					grid.handle(pygame.mouse.get_pos(), False)
+				if event.button in (1, 3) and pygame.key.get_mods() & pygame.KMOD_SHIFT:
+					corner = grid.cell_at(pygame.mouse.get_pos())
+				elif event.button == 3:
+					if grid.planner:
+						grid.edit_walls(pygame.mouse.get_pos(), False)
+					else:
+						grid.handle(pygame.mouse.get_pos(), False)
 				else:
 					place_obstacles = True
 			elif event.type == pygame.MOUSEBUTTONUP:
 				if place_obstacles:
 					place_obstacles = False
+					last_cell = None
+
+				# Fills the dragged rectangle with walls, or erases it with the right button
+				if corner:
+					other = grid.cell_at(pygame.mouse.get_pos())
+
+					if other:
+						grid.edit_cells(editing.rectangle(corner, other), event.button != 3)
+
+					corner = None
 			elif event.type == pygame.KEYDOWN:
 				if event.key == pygame.K_ESCAPE:
+					# The search would keep drawing after the window is closed
+					if thread.is_threading:
+						continue
+
 					is_running = False
-					os.execl(sys.executable, sys.executable, *sys.argv)
+					back_to_menu = True
+				elif event.key in GENERATOR_KEYS:
+					if thread.is_threading:
+						continue
+
+					thread.reset_finished_state()
+					generate_map(grid, GENERATOR_KEYS[event.key])
+				elif event.key == pygame.K_f:
+					# Fills the open region under the mouse with walls, or
+					# erases the walls joined to the wall under it
+					if thread.is_threading or (thread.finished_state and not grid.planner):
+						continue
+
+					coords = grid.cell_at(pygame.mouse.get_pos())
+
+					if coords:
+						grid.edit_cells(editing.flood(grid.model, coords), not grid.model.is_wall(coords))
 				elif event.key == pygame.K_c:
 					if thread.is_threading:
 						continue
 
 					thread.reset_finished_state()
 					grid.clear()
+				elif event.key == pygame.K_t:
+					# Saves the visit order of the last search
+					if thread.is_threading or not grid.last_run:
+						continue
+
+					grid.save_trace(TRACE_FILE)
+					print("Saved trace to " + TRACE_FILE)
+				elif event.key == pygame.K_s:
+					if thread.is_threading:
+						continue
+
+					grid.save_map(MAP_FILE)
+					print("Saved map to " + MAP_FILE)
+				elif event.key == pygame.K_l:
+					if thread.is_threading or not os.path.exists(MAP_FILE):
+						continue
+
+					thread.reset_finished_state()
+					grid.load_map(MAP_FILE)
+				elif event.key == pygame.K_m:
+					# Runs several algorithms on the map side by side
+					if not (grid.start and grid.finish) or thread.is_threading:
+						continue
+
+					is_running = compare(COMPARE_ALGORITHMS, grid.model, grid.start, grid.finish, TILE_SIZE)
+					place_obstacles = False
+
+					if is_running:
+						restore_window(grid)
 				elif event.key == pygame.K_d:
-					if not (grid.start and grid.finish) or thread.is_threading or thread.finished_state:
+					if not (grid.start and grid.finish) or thread.is_threading:
 						continue
 
-					start = grid.matrix[grid.start[0]][grid.start[1]]
-					finish = grid.matrix[grid.finish[0]][grid.finish[1]]
+					# Searching again on the same map only removes the marks of
+					# the last search, so the map and the cached paths are kept
+					if thread.finished_state:
+						grid.clear_path()
+						thread.reset_finished_state()
 
 					thread.turn_on()
 
 					algorithm_running = True
-
-					timer = threading.Thread(target = start_timer, args = (thread,))
-					timer.start()
+					reported = False
 
 					# Runs the pathfinding algortihm
-					if algorithm == "Dijkstras":
-						t1 = threading.Thread(target = dijkstras, args = (grid, start, finish, thread))
-					elif algorithm == "A*":
-						t1 = threading.Thread(target = A_star, args = (grid,thread))
-					elif algorithm == "DFS":
-						t1 = threading.Thread(target = dfs, args = (grid, thread))
-					else:
-						t1 = threading.Thread(target = bfs, args = (grid, thread))
-
+					t1 = threading.Thread(target = ALGORITHMS.get(algorithm, bfs), args = (grid, thread))
 					t1.start()
 		
+		# Draws the stroke since the last frame, so fast moves leave no gaps
+		if place_obstacles:
+			coords = grid.cell_at(pygame.mouse.get_pos())
+
+			if coords:
+				grid.edit_cells(editing.line(last_cell or coords, coords), True)
+
+			last_cell = coords
+
+		# Repairs the path once per frame after walls were edited
+		if grid.needs_replan and not thread.is_threading:
+			started = perf_counter()
+			result = grid.replan()
+			display_replan(result, perf_counter() - started)
+
+		# Shows the progress of the search once per frame, and its final
+		# numbers once it has ended
+		if not reported and thread.stats.started is not None:
+			display_stats(thread.stats)
+
+			if not thread.is_threading:
+				if not thread.path_exists:
+					display_time('Time: ' + 'Path not found')
+
+				thread.reset_path_exists()
+				reported = True
+
+		render_queue.flush()
+		clock.tick(FPS)
+
+	return close_window(back_to_menu, grid)
+
+def init_viewport(algorithm, rows, cols, tile_size, saved = None):
+	# Main loop for grids too large for a Cell per tile. The map is kept in a
+	# CompactGrid and drawn through a viewport: the arrow keys or dragging
+	# with the middle button pan it, and the mouse wheel zooms.
+	global algo
+
+	open_window(min(cols * tile_size, VIEWPORT_SIZE[0]) + 1, min(rows * tile_size, VIEWPORT_SIZE[1]) + 1, tile_size)
+
+	algo = algorithm
+
+	grid = CompactGrid(rows, cols)
+	view = Viewport(grid, WIDTH, HEIGHT, tile_size)
+
+	if saved:
+		restore(grid, saved)
+
+	place_obstacles = False
+	panning = False
+	is_running = True
+	back_to_menu = False
+	reported = True
+	last_cell = None
+	corner = None
+
+	thread = Thread(PROFILE_CPU, TRACE_MEMORY)
+
+	init_info_section(algorithm)
+
+	pans = {pygame.K_LEFT: (PAN_STEP, 0), pygame.K_RIGHT: (-PAN_STEP, 0), pygame.K_UP: (0, PAN_STEP), pygame.K_DOWN: (0, -PAN_STEP)}
+
+	while is_running:
+		for event in pygame.event.get():
+			if event.type == pygame.QUIT:
+				is_running = False
+			elif event.type == pygame.MOUSEWHEEL:
+				view.zoom_at(pygame.mouse.get_pos(), event.y)
+			elif event.type == pygame.MOUSEMOTION:
+				if panning:
+					view.pan(*event.rel)
+			elif event.type == pygame.MOUSEBUTTONDOWN:
+				if event.button == 2:
+					panning = True
+				elif event.button not in (1, 3) or thread.is_threading or thread.finished_state:
+					continue
+				elif pygame.key.get_mods() & pygame.KMOD_SHIFT:
+					corner = view.cell_at(event.pos)
+				elif event.button == 3:
+					coords = view.cell_at(event.pos)
+
+					if coords:
+						grid.handle(coords, False)
+				else:
+					place_obstacles = True
+			elif event.type == pygame.MOUSEBUTTONUP:
+				if event.button == 1:
+					place_obstacles = False
+					last_cell = None
+				elif event.button == 2:
+					panning = False
+
+				if corner and event.button in (1, 3):
+					other = view.cell_at(event.pos)
+
+					if other:
+						grid.edit_cells(editing.rectangle(corner, other), event.button == 1)
+
+					corner = None
+			elif event.type == pygame.KEYDOWN:
+				if event.key == pygame.K_ESCAPE:
+					# The search would keep drawing after the window is closed
+					if thread.is_threading:
+						continue
+
+					is_running = False
+					back_to_menu = True
+				elif event.key in pans:
+					view.pan(*pans[event.key])
+				elif event.key in GENERATOR_KEYS:
+					if thread.is_threading:
+						continue
+
+					thread.reset_finished_state()
+					generate_map(grid, GENERATOR_KEYS[event.key])
+					init_info_section(algorithm)
+				elif event.key == pygame.K_f:
+					if thread.is_threading or thread.finished_state:
+						continue
+
+					coords = view.cell_at(pygame.mouse.get_pos())
+
+					if coords:
+						grid.edit_cells(editing.flood(grid, coords), not grid.is_wall(coords))
+				elif event.key == pygame.K_c:
+					if thread.is_threading:
+						continue
+
+					thread.reset_finished_state()
+					grid.clear()
+					init_info_section(algorithm)
+				elif event.key == pygame.K_s:
+					if thread.is_threading:
+						continue
+
+					grid.save_map(MAP_FILE)
+					print("Saved map to " + MAP_FILE)
+				elif event.key == pygame.K_l:
+					if thread.is_threading or not os.path.exists(MAP_FILE):
+						continue
+
+					thread.reset_finished_state()
+					grid.load_map(MAP_FILE)
+				elif event.key == pygame.K_d:
+					if not (grid.start and grid.finish) or thread.is_threading:
+						continue
+
+					# Searching again on the same map only removes the marks of
+					# the last search, so the map and the cached paths are kept
+					if thread.finished_state:
+						grid.clear_path()
+						thread.reset_finished_state()
+
+					thread.turn_on()
+					reported = False
+
+					# Runs the pathfinding algortihm
+					t1 = threading.Thread(target = ALGORITHMS.get(algorithm, bfs), args = (grid, thread))
+					t1.start()
+
 		if place_obstacles:
-			pos = pygame.mouse.get_pos()
-			grid.handle(pos, True)
+			coords = view.cell_at(pygame.mouse.get_pos())
 
+			if coords:
+				grid.edit_cells(editing.line(last_cell or coords, coords), True)
+
+			last_cell = coords
+
+		if not reported and thread.stats.started is not None:
+			display_stats(thread.stats)
+
+			if not thread.is_threading:
+				if not thread.path_exists:
+					display_time('Time: ' + 'Path not found')
+
+				thread.reset_path_exists()
+				reported = True
+
+		# The cells change under the search thread, so the view is drawn every frame
+		render_queue.add(view.draw(window))
+		render_queue.flush()
 		clock.tick(FPS)
 
+	return close_window(back_to_menu, grid)
+
+def play_trace(filename, tile_size, speed = 1):
+	# Replays a recorded search. Space pauses, the arrow keys step back and
+	# forward or change the speed, and clicking the info section jumps to that
+	# point of the run.
+	global algo
+
+	trace = Trace(filename)
+	init_window(trace.rows, trace.cols, tile_size)
+
+	algo = 'Replay of ' + trace.algorithm
+	grid = Grid(trace.rows, trace.cols)
+	player = TracePlayer(grid, trace)
+	player.reset()
+
+	is_running = True
+	is_playing = True
+	shown = None
+
+	while is_running:
+		for event in pygame.event.get():
+			if event.type == pygame.QUIT:
+				is_running = False
+			elif event.type == pygame.MOUSEBUTTONDOWN:
+				x, y = event.pos
+
+				if y >= HEIGHT:
+					player.seek(len(trace) * x // WIDTH)
+			elif event.type == pygame.KEYDOWN:
+				if event.key == pygame.K_ESCAPE:
+					is_running = False
+				elif event.key == pygame.K_SPACE:
+					is_playing = not is_playing
+				elif event.key == pygame.K_RIGHT:
+					is_playing = False
+					player.seek(player.step + speed)
+				elif event.key == pygame.K_LEFT:
+					is_playing = False
+					player.seek(player.step - speed)
+				elif event.key == pygame.K_UP:
+					speed *= 2
+				elif event.key == pygame.K_DOWN:
+					speed = max(speed // 2, 1)
+				elif event.key == pygame.K_HOME:
+					player.seek(0)
+				elif event.key == pygame.K_END:
+					player.seek(len(trace))
+
+		if is_playing:
+			player.advance(speed)
+
+		# Only renders the progress text when it changes
+		progress = (player.step, speed)
+		if progress != shown:
+			display_time('Step: {} / {}   Speed: {}'.format(player.step, len(trace), speed))
+			shown = progress
+
+		render_queue.flush()
+		clock.tick(FPS)
+
+	trace.close()
 	pygame.quit()
 
+class TracePlayer:
+	def __init__(self, grid, trace):
+		# Animates the visits of a trace on a grid
+		self.grid = grid
+		self.trace = trace
+		self.step = 0
+
+	def reset(self):
+		# Redraws the recorded map without any visited cells
+		window.fill(BLACK)
+		self.grid.draw()
+		self.grid.model.clear()
+
+		for row, col in self.trace.wall_coords():
+			self.grid.place_obstacle((row, col), (col, row))
+
+		if self.trace.start:
+			self.grid.place_start(self.trace.start, self.trace.start[::-1])
+
+		if self.trace.finish:
+			self.grid.place_finish(self.trace.finish, self.trace.finish[::-1])
+
+		init_info_section(algo)
+		self.step = 0
+
+	def advance(self, steps):
+		# Visits the next cells of the trace and draws the path at the end
+		end = min(self.step + steps, len(self.trace))
+
+		# The two ends of a bidirectional search are drawn in their own colors
+		for step in range(self.step, end):
+			coords, backward = self.trace.visit(step)
+
+			if backward:
+				self.grid.visit(*coords, BACKWARD_PATH)
+			elif self.trace.bidirectional:
+				self.grid.visit(*coords, FORWARD_PATH)
+			else:
+				self.grid.visit(*coords)
+
+		if end == len(self.trace) and self.step < end:
+			self.grid.draw_path(self.trace.path_coords())
+
+		self.step = end
+
+	def seek(self, step):
+		# Jumps to any step. Going back replays the trace from the beginning,
+		# which is cheap since the visits are read from the memory mapping.
+		step = min(max(step, 0), len(self.trace))
+
+		if step < self.step:
+			self.reset()
+
+		self.advance(step - self.step)
+
 class Cell:
 	def __init__(self,rect,c):
 		self.rectangle = pygame.Rect(rect[0],rect[1],rect[2],rect[3])
 		self.width = TILE_SIZE
 		self.height = TILE_SIZE
 		self.color = c
-		self.parent = None
 		self.X = 0
 		self.Y = 0
-		self.cost = 1
-		self.g = float('inf')
-		self.h = float('inf')
-		self.f = float('inf')
 
 	def draw(self):
 		# Draws the cell onto the window
-		pygame.draw.rect(window, self.color, (self.rectangle))
-		pygame.display.update()
+		render_queue.add(pygame.draw.rect(window, self.color, (self.rectangle)))
 
 	def is_empty(self):
 		return True if self.color == BLACK else False
@@ -166,47 +634,6 @@ class Cell:
 	def is_finish(self):
 		return True if self.color == GREEN else False
 
-	def get_adjacent(self, grid, color = None):
-		adjacent = []
-
-		x = self.X
-		y = self.Y
-
-		g = grid.matrix
-
-		# Does not include cells that represent walls and paths 
-		exclude = {WALLS,PATH}
-
-		if color:
-			exclude.add(color)
-
-		# Finds the adjacent cells that are empty
-		if (x < len(g) - 1 and g[x+1][y].color not in exclude):
-			adjacent.append(g[x+1][y])
-
-		if (x < len(g) - 1 and y > 0 and g[x+1][y-1].color not in exclude):
-			adjacent.append(g[x+1][y-1])
-
-		if (y > 0 and g[x][y-1].color not in exclude):
-			adjacent.append(g[x][y-1])
-
-		if (x > 0 and y < len(g[0]) - 1 and g[x-1][y+1].color not in exclude):
-			adjacent.append(g[x-1][y+1])
-
-		if (x > 0 and g[x-1][y].color not in exclude):
-			adjacent.append(g[x-1][y])
-
-		if(x > 0 and y > 0 and g[x-1][y-1].color not in exclude):
-			adjacent.append(g[x-1][y-1])
-
-		if (y < len(g[0]) - 1 and g[x][y+1].color not in exclude):
-			adjacent.append(g[x][y+1])
-
-		if (x < len(g) - 1 and y < len(g[0]) - 1 and g[x+1][y+1].color not in exclude):
-			adjacent.append(g[x+1][y+1])
-
-		return adjacent
-
 	def __str__(self):
 		if self.color == RED:
 			return 'R'
@@ -218,13 +645,46 @@ class Cell:
 			return '.'
 
 class Grid:
-	def __init__(self,r,c):
+	def __init__(self,r,c, compact = False):
 		self.rows = r
 		self.cols = c
 		self.matrix = [[None for x in range(self.cols)] for y in range(self.rows)]
 		self.start = None
 		self.finish = None
 
+		# Recorder, algorithm, start, finish and result of the last search
+		self.last_run = None
+
+		# Cells colored by searches since the last clear_path, and the path
+		# drawn over them
+		self.visited = []
+		self.drawn_path = []
+
+		# Map used by the search algorithms, kept in sync with the walls drawn.
+		# The NumPy backed CompactGrid uses less memory on large maps.
+		self.model = CompactGrid(r, c) if compact else SearchGrid(r, c)
+
+		# Incremental planner of the last LPA* search, told about every wall
+		# edited afterwards so the path can be repaired instead of searched again
+		self.planner = None
+		self.needs_replan = False
+
+		# Cluster graph of the last HPA* search, kept up to date as walls change
+		self.hierarchy = None
+
+		# Landmark tables of the last ALT A* search
+		self.landmarks = None
+
+		# Bumped by every edit of the map. The recent edits are kept as
+		# (version, coords, wall) so cached results can be revalidated, with
+		# wall None for edits that do not add or remove a wall.
+		self.version = 0
+		self.edits = deque(maxlen = EDIT_LOG_SIZE)
+		self.path_cache = PathCache()
+
+		# Regions of the open cells, so unreachable queries skip the search
+		self.components = Components(self)
+
 	def fill_matrix(self):
 		# Fills the grid with empty cells
 		for r in range(len(self.matrix)):
@@ -237,7 +697,9 @@ class Grid:
 
 	def draw(self):
 		self.fill_matrix()
+		self.draw_lines()
 
+	def draw_lines(self):
 		# Draws the vertical grid lines
 		for x in range(0, WIDTH, TILE_SIZE):
 			pygame.draw.line(window, GRID, (x,0), (x,HEIGHT - 1), 1)
@@ -246,7 +708,18 @@ class Grid:
 		for y in range(0, HEIGHT, TILE_SIZE):
 			pygame.draw.line(window, GRID, (0,y), (WIDTH - 1, y), 1)
 
-		pygame.display.update()
+		render_queue.add(window.get_rect())
+
+	def redraw(self):
+		# Draws the grid lines and every cell again, erasing the path drawn over them
+		window.fill(BLACK, (0, 0, WIDTH, HEIGHT))
+		self.draw_lines()
+		self.drawn_path = []
+
+		for row in self.matrix:
+			for cell in row:
+				if not cell.is_empty():
+					cell.draw()
 
 	def remove(self, coords, pos):
 		# Removes the cell at the specified location
@@ -265,10 +738,13 @@ class Grid:
 			self.start = None
 		elif curr_cell.color == GREEN:
 			self.finish = None
+		elif curr_cell.color == WALLS:
+			self.model.set_wall(coords, False)
+			self.walls_changed([coords])
 
-		self.matrix[row][col] = cell
+		self.bump_version(coords, False if curr_cell.color == WALLS else None)
 
-		pygame.display.update()
+		self.matrix[row][col] = cell
 
 	def place_cell(self, coords, pos, cell):
 		# Places the cell in the grid
@@ -287,8 +763,6 @@ class Grid:
 		elif cell.color == GREEN:
 			self.finish = (row,col)
 
-		pygame.display.update()
-
 	def place_start(self, coords, pos):
 		# Places the start cell
 		x,y = pos
@@ -296,6 +770,7 @@ class Grid:
 		rect = pygame.Rect(x *  TILE_SIZE + 1, y * TILE_SIZE + 1, TILE_SIZE - 1, TILE_SIZE - 1)
 		cell = Cell(rect,RED)
 		self.place_cell(coords, pos, cell)
+		self.bump_version(coords)
 		
 	def place_finish(self, coords, pos):
 		# Places the finish cell
@@ -304,21 +779,100 @@ class Grid:
 		rect = pygame.Rect(x *  TILE_SIZE + 1, y * TILE_SIZE + 1,TILE_SIZE - 1, TILE_SIZE - 1)
 		cell = Cell(rect,GREEN)
 		self.place_cell(coords, pos, cell)
+		self.bump_version(coords)
 
 	def place_obstacle(self, coords, pos):
 		# Places the obstacle cell
 		x,y = pos
+		row, col = coords
+
+		# Dragging over a wall places it again, which does not change the map
+		if self.matrix[row][col].color != WALLS:
+			self.bump_version(coords, True)
 
 		rect = pygame.Rect(x * TILE_SIZE + 1, y * TILE_SIZE + 1, TILE_SIZE - 1, TILE_SIZE - 1)
 		cell = Cell(rect,WALLS)
 		self.place_cell(coords, pos, cell)
+		self.model.set_wall(coords)
+		self.walls_changed([coords])
+
+	def bump_version(self, coords = None, wall = None):
+		# Records an edit of the map, invalidating the cached results it affects
+		log_edits(self, [coords], wall)
+
+	def record_edits(self, cells, wall):
+		# Records edits of many cells as a single version
+		log_edits(self, cells, wall)
+
+	def walls_changed(self, cells):
+		# Tells the incremental planner and the cluster graph that cells
+		# became or stopped being walls
+		if self.planner:
+			for coords in cells:
+				self.planner.update_cell(coords)
+
+			self.needs_replan = True
+
+		if self.hierarchy:
+			# Past one cell per cluster, building the graph again is cheaper
+			if len(cells) > len(self.hierarchy.intra):
+				self.hierarchy = None
+			else:
+				self.hierarchy.update_cells(cells)
+
+	def edit_cells(self, cells, wall):
+		# Makes cells walls, or empties the walls among them, as one edit.
+		# The map and its masks are updated once, the cells are drawn with a
+		# single update of the window and the edits share one version. The
+		# start and finish cells are left as they are.
+		if wall:
+			changed = [(row, col) for row, col in cells if self.matrix[row][col].color not in (RED, GREEN, WALLS)]
+		else:
+			changed = [(row, col) for row, col in cells if self.matrix[row][col].color == WALLS]
+
+		if not changed:
+			return
+
+		color = WALLS if wall else BLACK
+		for row, col in changed:
+			cell = Cell((col * TILE_SIZE + 1, row * TILE_SIZE + 1, TILE_SIZE - 1, TILE_SIZE - 1), color)
+			cell.X, cell.Y = row, col
+			window.fill(color, cell.rectangle)
+			self.matrix[row][col] = cell
 
-	def visit(self, c, color = None):
-		# Visits the cell
-		row = c.X
-		col = c.Y
+		rows = [row for row, col in changed]
+		cols = [col for row, col in changed]
+		render_queue.add(pygame.Rect(min(cols) * TILE_SIZE, min(rows) * TILE_SIZE,
+			(max(cols) - min(cols) + 1) * TILE_SIZE + 1, (max(rows) - min(rows) + 1) * TILE_SIZE + 1))
 
-		if (self.matrix[row][col].color == RED) or (self.matrix[row][col].color == GREEN):
+		self.model.set_walls(changed, wall)
+		self.record_edits(changed, wall)
+		self.walls_changed(changed)
+
+	def cell_at(self, pos):
+		# Cell under a point of the window, or None outside the grid
+		x, y = pos
+
+		if y >= HEIGHT - 1 or x >= WIDTH - 1:
+			return None
+
+		return y // TILE_SIZE, x // TILE_SIZE
+
+	def replan(self):
+		# Repairs the path of the incremental planner and draws it again. Only
+		# the cells whose distance from the start changed are visited.
+		self.needs_replan = False
+		result = self.planner.compute(self.visit)
+
+		self.redraw()
+		if result.found:
+			self.draw_path(result.path)
+
+		return result
+
+	def visit(self, row, col, color = None):
+		# Visits the cell. Walls are never recolored, so they can still be erased.
+		if self.matrix[row][col].color in (RED, GREEN, WALLS):
 			return
 
 		x = col
@@ -333,12 +887,12 @@ class Grid:
 			cell = Cell(rect, PATH)
 
 		self.matrix[row][col] = cell
+		self.visited.append((row, col))
 		cell.draw()
 
-	def mark_path(self, c):
+	def mark_path(self, coords):
 		# Marks the cell as part of the shortest path
-		row = c.X
-		col = c.Y
+		row, col = coords
 
 		if self.matrix[row][col].color == RED or self.matrix[row][col].color == GREEN:
 			return
@@ -352,19 +906,86 @@ class Grid:
 		cell.draw()
 
 	def create_line_path(self, path):
-		# Draws a line through the shortest path
-		finish = self.matrix[self.finish[0]][self.finish[1]]
+		# Draws a line through the cells of the path, given as (row, col) pairs
+		prev = None
 
-		prev = (finish.Y * TILE_SIZE + TILE_SIZE//2, finish.X * TILE_SIZE + TILE_SIZE//2)
+		for row, col in path:
+			curr = (col * TILE_SIZE + TILE_SIZE//2, row * TILE_SIZE + TILE_SIZE//2)
 
-		for cell in path:
-			curr = (cell.Y * TILE_SIZE + TILE_SIZE//2, cell.X * TILE_SIZE + TILE_SIZE//2)
-			pygame.draw.line(window, LINE_PATH, prev, curr, 3)
+			if prev:
+				render_queue.add(pygame.draw.line(window, LINE_PATH, prev, curr, 3))
 
 			prev = curr
-		
-		pygame.display.update()	
 
+	def draw_path(self, path):
+		# Marks the cells between the start and finish cells, then draws a line through them
+		for coords in path[1:-1]:
+			self.mark_path(coords)
+
+		self.create_line_path(path)
+		self.drawn_path += path
+
+	def save_trace(self, filename):
+		# Writes the visit order of the last search to a trace file
+		recorder, algorithm, start, finish, result = self.last_run
+		recorder.save(filename, algorithm, start, finish, result)
+
+	def edit_walls(self, pos, obstacle):
+		# Adds or removes the wall at the clicked cell, leaving the start and
+		# finish cells and the cells that already are walls as they are
+		x, y = pos
+
+		# Bounds check
+		if y >= HEIGHT - 1 or x >= WIDTH - 1:
+			return
+
+		row = y // TILE_SIZE
+		col = x // TILE_SIZE
+		cell = self.matrix[row][col]
+
+		if cell.color in (RED, GREEN):
+			return
+
+		if obstacle and cell.color != WALLS:
+			self.place_obstacle((row, col), (col, row))
+		elif not obstacle and cell.color == WALLS:
+			self.remove((row, col), (col, row))
+
+	def save_map(self, filename):
+		map_io.save(filename, self.model, self.start, self.finish)
+
+		# Tables of the last ALT A* search are saved next to the map, and
+		# used again once it is loaded
+		if self.landmarks and self.landmarks.is_current(self.model):
+			self.landmarks.save(landmarks.landmark_file(filename))
+
+	def load_map(self, filename):
+		# Replaces the walls, start and finish cells with those of a saved map
+		# of the same size
+		map_file = map_io.MapFile(filename)
+
+		if (map_file.rows, map_file.cols) != (self.rows, self.cols):
+			print("{} is {}x{}, the grid is {}x{}".format(filename, map_file.rows, map_file.cols, self.rows, self.cols))
+			map_file.close()
+			return
+
+		walls = map_file.walls()
+		start, finish = map_file.start, map_file.finish
+		map_file.close()
+
+		self.load_walls(walls, start, finish)
+
+	def load_walls(self, walls, start = None, finish = None):
+		# Replaces the walls with the flags of walls, one per cell in the
+		# order of the flat indices, and places the start and finish cells
+		self.clear()
+		self.edit_cells([divmod(index, self.cols) for index, wall in enumerate(bytes(walls)) if wall], True)
+
+		if start:
+			self.place_start(start, start[::-1])
+
+		if finish:
+			self.place_finish(finish, finish[::-1])
 
 	def handle(self,pos, obstacle):
 		# Processes the cell which the user clicked
@@ -408,38 +1029,47 @@ class Grid:
 			else:
 				self.remove(coords,pos)
 
-		# Updates the screen
-		pygame.display.update()
-
 	def clear(self):
 		# Resets the grid
 		window.fill(BLACK)
 		self.draw()
 		self.start = None
 		self.finish = None
+		self.visited = []
+		self.drawn_path = []
 		self.fill_matrix()
+		self.model.clear()
+		self.planner = None
+		self.needs_replan = False
+		self.hierarchy = None
+
+		# Clearing removes every wall, so no cached result survives it
+		self.bump_version(None, False)
 
 		init_info_section(algo)
 
 
 	def clear_path(self):
-		# Removes the cells that represent a path
-		g = self.matrix
+		# Removes the cells that represent a path and the line drawn through
+		# them. Only the cells visited or on a path since the last call are
+		# looked at, and they are drawn again in place with their grid lines.
+		cells = set(self.visited)
 
-		for r in range(len(g)):
-			for c in range(len(g[0])):
-				cell = g[r][c]
+		for (row, col), (next_row, next_col) in zip(self.drawn_path, self.drawn_path[1:]):
+			# The line of a diagonal step also crosses the corners of the two tiles beside it
+			cells.update(((row, col), (row, next_col), (next_row, col), (next_row, next_col)))
 
-				if cell.color == PATH:
-					self.remove((r,c),(c,r))
+		for row, col in cells:
+			cell = self.matrix[row][col]
 
-	def __str__(self):
-		result = ""
+			if cell.color in (PATH, FORWARD_PATH, BACKWARD_PATH):
+				cell.color = BLACK
 
-		for r in range(len(self.matrix)):
-			for c in range(len(self.matrix[0])):
-				cell = self.matrix[r][c]
-				result += str(cell)
-			result += '\n'
+			render_queue.add(pygame.draw.rect(window, GRID, (col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE + 1, TILE_SIZE + 1), 1))
+			render_queue.add(window.fill(cell.color, (col * TILE_SIZE + 1, row * TILE_SIZE + 1, TILE_SIZE - 1, TILE_SIZE - 1)))
 
-		return result
+		self.visited = []
+		self.drawn_path = []
+
+	def __str__(self):
+		return ''.join(''.join(str(cell) for cell in row) + '\n' for row in self.matrix)
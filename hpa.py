@@ -0,0 +1,518 @@
+import heapq
+from search import BITS, SearchResult, chebyshev
+from landmarks import uniform_costs
+
+# Side length of the square clusters
+CLUSTER_SIZE = 16
+
+# Entrances at least this wide get a transition at both ends instead of a
+# single one in the middle
+WIDE_ENTRANCE = 6
+
+# Turns a row of wall flags into the digits of its open cells, for int(digits, 2)
+FREE_DIGITS = bytes.maketrans(b'\x00\x01', b'10')
+
+def dilate(bits, width):
+	# The cells of a bitset and every cell next to them, diagonals included.
+	# Rows of the bitset are width bits long.
+	row = bits | bits << 1 | bits >> 1
+	return row | row << width | row >> width
+
+def lowest(bits):
+	# Position of the lowest set bit
+	return (bits & -bits).bit_length() - 1
+
+class HierarchicalMap:
+	def __init__(self, grid, cluster_size = CLUSTER_SIZE):
+		# Abstract graph for HPA*. The grid is split into square clusters and
+		# every entrance between two clusters gets a transition, a pair of
+		# cells on either side of it, whose ends become nodes. Nodes of the
+		# same cluster are joined by edges holding their distance inside the
+		# cluster, so a query only searches this graph and the clusters of its
+		# start and finish cells.
+		self.grid = grid
+		self.cluster_size = cluster_size
+		self.cluster_rows = -(-grid.rows // cluster_size)
+		self.cluster_cols = -(-grid.cols // cluster_size)
+
+		# Every cluster is searched on bitsets of its cells: bit
+		# (row - top + 1) * width + col - left + 1 stands for a cell, with a
+		# border of closed bits around so shifts never wrap to another row.
+		# free holds the open cells of every cluster and regions the parts of
+		# them joined inside the cluster. Bitsets only count steps, so they
+		# are used when every step costs the same.
+		self.uniform = uniform_costs(grid)
+		self.free = {}
+		self.regions = {}
+
+		# Transitions of every pair of touching clusters, keyed by the pair
+		# with the smaller cluster first, as (cell in first, cell in second)
+		self.borders = {}
+
+		# Edges leaving every node: inter[node] to the other side of its
+		# transitions, intra[cluster][node] to the nodes of its own cluster
+		self.inter = {}
+		self.intra = {}
+
+		walls = bytes(grid.walls)
+		for cluster in range(self.cluster_rows * self.cluster_cols):
+			self.build_free(cluster, walls)
+
+		for cluster in range(self.cluster_rows * self.cluster_cols):
+			for other in self.later_neighbors(cluster):
+				self.build_border(cluster, other)
+
+		for cluster in range(self.cluster_rows * self.cluster_cols):
+			self.build_cluster(cluster)
+
+	def cluster_of(self, index):
+		row, col = divmod(index, self.grid.cols)
+		return row // self.cluster_size * self.cluster_cols + col // self.cluster_size
+
+	def bounds(self, cluster):
+		# First and last row and column of a cluster, inclusive
+		row, col = divmod(cluster, self.cluster_cols)
+		size = self.cluster_size
+
+		return (row * size, min((row + 1) * size, self.grid.rows) - 1,
+			col * size, min((col + 1) * size, self.grid.cols) - 1)
+
+	def width(self, cluster):
+		# Length of a row of the bitsets of a cluster
+		top, bottom, left, right = self.bounds(cluster)
+		return right - left + 3
+
+	def bit(self, cluster, index):
+		top, bottom, left, right = self.bounds(cluster)
+		row, col = divmod(index, self.grid.cols)
+
+		return (row - top + 1) * (right - left + 3) + col - left + 1
+
+	def cell(self, cluster, bit):
+		top, bottom, left, right = self.bounds(cluster)
+		row, col = divmod(bit, right - left + 3)
+
+		return (row + top - 1) * self.grid.cols + col + left - 1
+
+	def neighbors(self, cluster):
+		# Clusters touching a cluster, diagonal ones included
+		row, col = divmod(cluster, self.cluster_cols)
+
+		for dr in (-1, 0, 1):
+			for dc in (-1, 0, 1):
+				r = row + dr
+				c = col + dc
+
+				if (dr or dc) and 0 <= r < self.cluster_rows and 0 <= c < self.cluster_cols:
+					yield r * self.cluster_cols + c
+
+	def later_neighbors(self, cluster):
+		return [other for other in self.neighbors(cluster) if other > cluster]
+
+	def nodes(self, cluster):
+		# Cells of a cluster that are the end of some transition
+		nodes = set()
+
+		for other in self.neighbors(cluster):
+			first, second = min(cluster, other), max(cluster, other)
+
+			for a, b in self.borders.get((first, second), ()):
+				nodes.add(a if first == cluster else b)
+
+		return nodes
+
+	def open(self, index, direction):
+		# Whether the cell next to index in the direction is passable
+		return self.grid.adjacency[index] & BITS[direction]
+
+	def build_free(self, cluster, walls = None):
+		# Computes the bitset of the open cells of a cluster and splits it
+		# into regions. Without walls they are read from the grid a cell at a
+		# time, which is cheaper than copying every wall for one cluster.
+		grid = self.grid
+		cols = grid.cols
+		top, bottom, left, right = self.bounds(cluster)
+		width = right - left + 3
+		free = 0
+
+		for row in range(top, bottom + 1):
+			if walls is None:
+				flags = bytes(grid.is_wall((row, col)) for col in range(left, right + 1))
+			else:
+				flags = walls[row * cols + left:row * cols + right + 1]
+
+			free |= int(flags.translate(FREE_DIGITS)[::-1], 2) << ((row - top + 1) * width + 1)
+
+		regions = []
+		remaining = free
+
+		while remaining:
+			region = remaining & -remaining
+
+			while True:
+				grown = dilate(region, width) & free
+				if grown == region:
+					break
+
+				region = grown
+
+			regions.append(region)
+			remaining &= ~region
+
+		self.free[cluster] = free
+		self.regions[cluster] = regions
+
+	def region_of(self, cluster, index):
+		# Number of the region of a cluster that holds an open cell
+		bit = 1 << self.bit(cluster, index)
+		return next(i for i, region in enumerate(self.regions[cluster]) if region & bit)
+
+	def transitions(self, first, second):
+		# Finds the transitions between two touching clusters. Every pair of
+		# open cells a step apart across the border can be crossed. Crossings
+		# whose ends are in the same region of each cluster are one entrance,
+		# since a path through one of them can go through any other instead,
+		# and each entrance gets a transition in its middle, or one at each
+		# end if it is wide.
+		cols = self.grid.cols
+		top, bottom, left, right = self.bounds(first)
+		second_top, _, second_left, _ = self.bounds(second)
+		dr = (second_top > top) - (second_top < top)
+		dc = (second_left > left) - (second_left < left)
+
+		if dr and dc:
+			# Diagonal neighbors only touch at a corner, and a step across it
+			# is only needed when it squeezes between two walls
+			a = (bottom if dr > 0 else top) * cols + (right if dc > 0 else left)
+			b = a + dr * cols + dc
+			squeeze = self.open(a, (dr, dc)) and self.open(b, (-dr, -dc)) \
+				and not self.open(a, (dr, 0)) and not self.open(a, (0, dc))
+			return [(a, b)] if squeeze else []
+
+		# Cells of the first cluster along the border and the step across it
+		if dr:
+			cells = [(bottom if dr > 0 else top) * cols + col for col in range(left, right + 1)]
+			along = (0, 1)
+		else:
+			cells = [row * cols + (right if dc > 0 else left) for row in range(top, bottom + 1)]
+			along = (1, 0)
+
+		step = dr * cols + dc
+		entrances = {}
+
+		for i, a in enumerate(cells):
+			if not self.open(a + step, (-dr, -dc)):
+				continue
+
+			# Straight across, else diagonally into the cells beside
+			crossings = []
+			if self.open(a, (dr, dc)):
+				crossings.append(a + step)
+
+			for sign in (-1, 1):
+				if 0 <= i + sign < len(cells):
+					direction = (dr + sign * along[0], dc + sign * along[1])
+					if self.open(a, direction):
+						crossings.append(a + step + sign * (along[0] * cols + along[1]))
+
+			# One crossing of a cell per entrance, straight ones first
+			region = self.region_of(first, a)
+			crossed = set()
+
+			for b in crossings:
+				key = (region, self.region_of(second, b))
+
+				if key not in crossed:
+					crossed.add(key)
+					entrances.setdefault(key, []).append((a, b))
+
+		transitions = []
+		for crossings in entrances.values():
+			if cells.index(crossings[-1][0]) - cells.index(crossings[0][0]) + 1 >= WIDE_ENTRANCE:
+				transitions += [crossings[0], crossings[-1]]
+			else:
+				transitions.append(crossings[len(crossings) // 2])
+
+		return transitions
+
+	def build_border(self, first, second):
+		# Replaces the transitions between two clusters and their edges
+		costs = self.grid.costs
+
+		for a, b in self.borders.pop((first, second), ()):
+			self.inter.get(a, {}).pop(b, None)
+			self.inter.get(b, {}).pop(a, None)
+
+		transitions = self.transitions(first, second)
+
+		for a, b in transitions:
+			self.inter.setdefault(a, {})[b] = costs[b]
+			self.inter.setdefault(b, {})[a] = costs[a]
+
+		if transitions:
+			self.borders[(first, second)] = transitions
+
+	def build_cluster(self, cluster):
+		# Computes the distance inside the cluster between every two of its
+		# nodes. Only nodes of the same region can reach each other.
+		nodes = self.nodes(cluster)
+		regions = {node: self.region_of(cluster, node) for node in nodes}
+		edges = {}
+
+		for node in nodes:
+			distances, expanded = self.distances(cluster, node, [other for other in nodes if regions[other] == regions[node]])
+			edges[node] = {other: cost for other, cost in distances.items() if other != node}
+
+		self.intra[cluster] = edges
+
+	def update_cell(self, coords):
+		# Must be called after a cell became a wall or stopped being one
+		self.update_cells([coords])
+
+	def update_cells(self, cells):
+		# Must be called after the cells became walls or stopped being ones.
+		# The free cells and regions of every cluster touched are found first,
+		# as a border depends on the regions of both its clusters. Then only
+		# the borders the cells can affect are rebuilt, and only the clusters
+		# whose nodes changed have their distances computed again.
+		changed = {self.cluster_of(self.grid.index(*coords)) for coords in cells}
+		around = set(changed)
+		for cluster in changed:
+			around.update(self.neighbors(cluster))
+
+		before = {other: self.nodes(other) for other in around}
+
+		for cluster in changed:
+			self.build_free(cluster)
+
+		# Borders of the clusters, and the corners between their neighbors
+		# that a step squeezing past a cell would cross
+		pairs = set()
+		for cluster in changed:
+			others = list(self.neighbors(cluster))
+			pairs.update((min(cluster, other), max(cluster, other)) for other in others)
+
+			for first in others:
+				for second in others:
+					if first < second and second in self.neighbors(first):
+						pairs.add((first, second))
+
+		for first, second in pairs:
+			self.build_border(first, second)
+
+		for other in around:
+			if other in changed or self.nodes(other) != before[other]:
+				self.build_cluster(other)
+
+	def layers(self, cluster, source, targets = 0):
+		# Breadth first search from source that never leaves the cluster, as
+		# the bitset of the cells reached at every step. Stops once every bit
+		# of targets has been reached, or the region of source has.
+		free = self.free[cluster]
+		width = self.width(cluster)
+		layer = seen = 1 << self.bit(cluster, source)
+		layers = [layer]
+		targets &= ~layer
+
+		while layer and targets:
+			layer = dilate(layer, width) & free & ~seen
+			seen |= layer
+			targets &= ~layer
+
+			if layer:
+				layers.append(layer)
+
+		return layers
+
+	def distances(self, cluster, source, targets, reverse = False):
+		# Cost from source to every cell of targets it can reach inside the
+		# cluster, or from those cells to source with reverse, and the number
+		# of cells searched
+		if not self.uniform:
+			distances, parents, expanded = self.local_search(source, cluster, targets, reverse = reverse)
+			return {target: distances[target] for target in targets if target in distances}, expanded
+
+		bits = {target: 1 << self.bit(cluster, target) for target in targets}
+		layers = self.layers(cluster, source, sum(bits.values()))
+		step = self.grid.costs[source]
+		distances = {}
+
+		for steps, layer in enumerate(layers):
+			for target, bit in bits.items():
+				if layer & bit:
+					distances[target] = steps * step
+
+		return distances, sum(bin(layer).count('1') for layer in layers)
+
+	def local_search(self, source, cluster, targets = (), target = None, reverse = False):
+		# Dijkstra's algorithm from source that never leaves the cluster, for
+		# maps whose steps do not all cost the same. Stops once every cell of
+		# targets, or target, has been settled. With reverse the distances are
+		# to source instead of from it.
+		grid = self.grid
+		cols = grid.cols
+		costs = grid.costs
+		offsets = grid.offsets
+		adjacency = grid.adjacency
+		top, bottom, left, right = self.bounds(cluster)
+
+		distances = {}
+		parents = {source: source}
+		g = {source: 0}
+		remaining = len(targets)
+		heap = [(0, source)]
+		expanded = 0
+
+		while heap:
+			cost, current = heapq.heappop(heap)
+
+			if current in distances:
+				continue
+
+			distances[current] = cost
+			expanded += 1
+
+			if current == target:
+				break
+
+			if current in targets:
+				remaining -= 1
+
+				if not remaining and target is None:
+					break
+
+			for delta in offsets[adjacency[current]]:
+				neighbor = current + delta
+				row, col = divmod(neighbor, cols)
+
+				if neighbor in distances or not (top <= row <= bottom and left <= col <= right):
+					continue
+
+				total_cost = cost + (costs[current] if reverse else costs[neighbor])
+
+				if total_cost < g.get(neighbor, total_cost + 1):
+					g[neighbor] = total_cost
+					parents[neighbor] = current
+					heapq.heappush(heap, (total_cost, neighbor))
+
+		return distances, parents, expanded
+
+	def local_path(self, source, target, cluster):
+		# Shortest path between two cells of a cluster, as flat indices
+		if not self.uniform:
+			distances, parents, expanded = self.local_search(source, cluster, target = target)
+
+			path = [target]
+			while path[-1] != source:
+				path.append(parents[path[-1]])
+
+			path.reverse()
+			return path, expanded
+
+		# Walks back from the target through the layers, each step to any
+		# cell of the layer before that is next to the current one
+		width = self.width(cluster)
+		layers = self.layers(cluster, source, 1 << self.bit(cluster, target))
+		current = 1 << self.bit(cluster, target)
+		path = [target]
+
+		for layer in reversed(layers[:-1]):
+			current = dilate(current, width) & layer
+			current &= -current
+			path.append(self.cell(cluster, lowest(current)))
+
+		path.reverse()
+		return path, sum(bin(layer).count('1') for layer in layers)
+
+	def search(self, grid, start, finish, visit = None):
+		# Same signature as the searches in the search module. Links the
+		# start and finish cells to the nodes of their clusters, searches the
+		# abstract graph, then refines each edge into cells. The path is not
+		# always the shortest, since clusters are only entered at transitions.
+		# visit(row, col) is called for the nodes expanded in the abstract graph.
+		if grid is not self.grid:
+			self.__init__(grid, self.cluster_size)
+
+		source = grid.index(*start)
+		target = grid.index(*finish)
+
+		if grid.is_wall(start) or grid.is_wall(finish):
+			return SearchResult([], float('inf'), 0)
+
+		start_cluster = self.cluster_of(source)
+		finish_cluster = self.cluster_of(target)
+		start_nodes = self.nodes(start_cluster)
+		finish_nodes = self.nodes(finish_cluster)
+
+		# Edges from the start cell and into the finish cell
+		start_edges, expanded = self.distances(start_cluster, source, start_nodes | {target} if start_cluster == finish_cluster else start_nodes)
+		finish_edges, finish_expanded = self.distances(finish_cluster, target, finish_nodes, reverse = True)
+		expanded += finish_expanded
+
+		# A* on the abstract graph
+		g = {source: 0}
+		parents = {source: source}
+		closed = set()
+		heap = [(chebyshev(grid, source, target), source)]
+		pushes = 1
+		max_frontier = 1
+
+		while heap:
+			f, current = heapq.heappop(heap)
+
+			if current in closed:
+				continue
+
+			if current == target:
+				break
+
+			closed.add(current)
+			expanded += 1
+			if visit:
+				visit(*grid.coords(current))
+
+			edges = list(self.inter.get(current, {}).items())
+			edges += self.intra.get(self.cluster_of(current), {}).get(current, {}).items()
+
+			if current == source:
+				edges += start_edges.items()
+
+			if current in finish_edges:
+				edges.append((target, finish_edges[current]))
+
+			for neighbor, cost in edges:
+				total_cost = g[current] + cost
+
+				if neighbor not in closed and total_cost < g.get(neighbor, total_cost + 1):
+					g[neighbor] = total_cost
+					parents[neighbor] = current
+					heapq.heappush(heap, (total_cost + chebyshev(grid, neighbor, target), neighbor))
+					pushes += 1
+
+			max_frontier = max(max_frontier, len(heap))
+
+		if target not in parents:
+			return SearchResult([], float('inf'), expanded, max_frontier = max_frontier, pushes = pushes)
+
+		# Refines the abstract path one edge at a time
+		nodes = [target]
+		while nodes[-1] != source:
+			nodes.append(parents[nodes[-1]])
+		nodes.reverse()
+
+		path = [source]
+		for current, following in zip(nodes, nodes[1:]):
+			cluster = self.cluster_of(current)
+
+			# Nodes of different clusters are the two ends of a transition
+			if cluster != self.cluster_of(following):
+				path.append(following)
+				continue
+
+			cells, refine_expanded = self.local_path(current, following, cluster)
+			path += cells[1:]
+			expanded += refine_expanded
+
+		cost = sum(grid.costs[index] for index in path[1:])
+		return SearchResult([grid.coords(index) for index in path], cost, expanded,
+			max_frontier = max_frontier, pushes = pushes)
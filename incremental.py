@@ -0,0 +1,142 @@
+import heapq
+from array import array
+from search import UNREACHED, SearchResult, chebyshev
+
+class LPAStar:
+	def __init__(self, grid, start, finish):
+		# Lifelong Planning A*. The g and rhs values of every cell are kept
+		# between searches, so after walls change only the cells whose
+		# distance from the start changed are expanded again.
+		self.grid = grid
+		self.start = start
+		self.finish = finish
+		self.source = grid.index(*start)
+		self.target = grid.index(*finish)
+
+		size = grid.rows * grid.cols
+		self.g = array('i', [UNREACHED]) * size
+		self.rhs = array('i', [UNREACHED]) * size
+		self.rhs[self.source] = 0
+
+		# Open list with lazy deletion: queued maps each open cell to its
+		# current key and heap entries with any other key are stale
+		self.heap = []
+		self.queued = {}
+		self.push(self.source)
+
+	def key(self, index):
+		best = min(self.g[index], self.rhs[index])
+		return (best + chebyshev(self.grid, index, self.target), best)
+
+	def push(self, index):
+		key = self.key(index)
+		self.queued[index] = key
+		heapq.heappush(self.heap, (key, index))
+
+	def top_key(self):
+		# Smallest key in the open list, dropping stale entries on the way
+		while self.heap:
+			key, index = self.heap[0]
+
+			if self.queued.get(index) == key:
+				return key
+
+			heapq.heappop(self.heap)
+
+		return (UNREACHED, UNREACHED)
+
+	def update_vertex(self, index):
+		# Recomputes the one step lookahead cost of a cell and queues it if it
+		# no longer agrees with its g value
+		grid = self.grid
+
+		if index != self.source:
+			best = UNREACHED
+
+			if not grid.is_wall(grid.coords(index)):
+				cost = grid.costs[index]
+
+				for delta in grid.offsets[grid.adjacency[index]]:
+					g = self.g[index + delta]
+					if g != UNREACHED and g + cost < best:
+						best = g + cost
+
+			self.rhs[index] = best
+
+		self.queued.pop(index, None)
+		if self.g[index] != self.rhs[index]:
+			self.push(index)
+
+	def update_cell(self, coords):
+		# Must be called after a cell became a wall or stopped being one
+		index = self.grid.index(*coords)
+		self.update_vertex(index)
+
+		# Neighbors on either side of the change may have routed through it
+		row, col = coords
+		for dr in (-1, 0, 1):
+			for dc in (-1, 0, 1):
+				r = row + dr
+				c = col + dc
+
+				if (dr or dc) and 0 <= r < self.grid.rows and 0 <= c < self.grid.cols:
+					self.update_vertex(r * self.grid.cols + c)
+
+	def compute(self, visit = None):
+		# Expands cells until the finish cell's g value is settled
+		grid = self.grid
+		target = self.target
+		expanded = 0
+		pushes = len(self.queued)
+		max_frontier = len(self.queued)
+
+		while self.top_key() < self.key(target) or self.rhs[target] != self.g[target]:
+			key, current = heapq.heappop(self.heap)
+			del self.queued[current]
+
+			expanded += 1
+
+			# Cells that became walls are expanded to take them off the path,
+			# but are not shown as visited
+			if visit and not grid.is_wall(grid.coords(current)):
+				visit(*grid.coords(current))
+
+			neighbors = [current + delta for delta in grid.offsets[grid.adjacency[current]]]
+
+			if self.g[current] > self.rhs[current]:
+				self.g[current] = self.rhs[current]
+			else:
+				self.g[current] = UNREACHED
+				self.update_vertex(current)
+
+			for neighbor in neighbors:
+				self.update_vertex(neighbor)
+
+			max_frontier = max(max_frontier, len(self.queued))
+
+		return SearchResult(self.path(), self.g[target] if self.g[target] != UNREACHED else float('inf'),
+			expanded, max_frontier = max_frontier, pushes = pushes, neighbor_calls = expanded)
+
+	def path(self):
+		# Follows the cheapest neighbor back from the finish cell
+		grid = self.grid
+		current = self.target
+
+		if self.g[current] == UNREACHED:
+			return []
+
+		path = [grid.coords(current)]
+		while current != self.source:
+			current = min((current + delta for delta in grid.offsets[grid.adjacency[current]]), key = self.g.__getitem__)
+			path.append(grid.coords(current))
+
+		path.reverse()
+		return path
+
+	def search(self, grid, start, finish, visit = None):
+		# Same signature as the searches in the search module. Starts over if
+		# the map, start or finish cell is not the one being planned on.
+		if (grid, start, finish) != (self.grid, self.start, self.finish):
+			self.__init__(grid, start, finish)
+
+		return self.compute(visit)
@@ -0,0 +1,128 @@
+import cProfile
+import io
+import pstats
+import tracemalloc
+from time import perf_counter
+
+class SearchStats:
+	def __init__(self, profile_cpu = False, trace_memory = False):
+		# Counters and timings of a single search. Expansions and the render
+		# time are updated live through the visit wrapper, the other counters
+		# are copied from the SearchResult when the search ends.
+		self.expansions = 0
+		self.pushes = 0
+		self.duplicate_pushes = 0
+		self.neighbor_calls = 0
+		self.max_frontier = 0
+
+		# Set when the result came from the path cache, so nothing was
+		# searched and the counters stay at zero
+		self.cached = False
+
+		self.started = None
+		self.finished = None
+		self.render_time = 0.0
+
+		# Time spent before the search building the tables or graph it
+		# needs, such as the HPA* cluster graph
+		self.build_time = 0.0
+
+		# Opt-in profiling, filled in when the search ends
+		self.profile_cpu = profile_cpu
+		self.trace_memory = trace_memory
+		self.profile = None
+		self.peak_memory = None
+		self._profiler = None
+
+	def start(self):
+		if self.trace_memory:
+			tracemalloc.start()
+
+		if self.profile_cpu:
+			self._profiler = cProfile.Profile()
+			self._profiler.enable()
+
+		self.started = perf_counter()
+
+	def stop(self, result = None):
+		self.finished = perf_counter()
+
+		if self._profiler:
+			self._profiler.disable()
+			output = io.StringIO()
+			pstats.Stats(self._profiler, stream = output).sort_stats("cumulative").print_stats(20)
+			self.profile = output.getvalue()
+			self._profiler = None
+
+		if self.trace_memory and tracemalloc.is_tracing():
+			self.peak_memory = tracemalloc.get_traced_memory()[1]
+			tracemalloc.stop()
+
+		if result and not self.cached:
+			self.expansions = result.expanded
+			self.pushes = result.pushes
+			self.duplicate_pushes = result.duplicate_pushes
+			self.neighbor_calls = result.neighbor_calls
+			self.max_frontier = result.max_frontier
+
+	def timed(self, visit):
+		# Wraps a visit callback so its time counts as render time
+		def timed_visit(*args):
+			self.expansions += 1
+			start = perf_counter()
+			visit(*args)
+			self.render_time += perf_counter() - start
+
+		return timed_visit
+
+	def time_render(self, draw, *args):
+		# Calls a drawing function and counts its time as render time
+		start = perf_counter()
+		draw(*args)
+		self.render_time += perf_counter() - start
+
+	@property
+	def running(self):
+		return self.started is not None and self.finished is None
+
+	@property
+	def elapsed(self):
+		# Time since the search started, or its total time once it has ended
+		if self.started is None:
+			return 0.0
+
+		return (self.finished or perf_counter()) - self.started
+
+	@property
+	def search_time(self):
+		return max(self.elapsed - self.render_time, 0.0)
+
+	def as_dict(self):
+		return {
+			"expansions": self.expansions,
+			"pushes": self.pushes,
+			"duplicate_pushes": self.duplicate_pushes,
+			"neighbor_calls": self.neighbor_calls,
+			"max_frontier": self.max_frontier,
+			"cached": self.cached,
+			"elapsed": self.elapsed,
+			"search_time": self.search_time,
+			"render_time": self.render_time,
+			"build_time": self.build_time,
+			"peak_memory": self.peak_memory,
+		}
+
+def format_time(seconds):
+	# Formats a duration as seconds:milliseconds
+	milliseconds = int(seconds * 1000)
+	return "{}:{:03d}".format(milliseconds // 1000, milliseconds % 1000)
+
+def measure(algorithm, grid, start, finish, visit = None, profile_cpu = False, trace_memory = False):
+	# Runs a search from the search module and returns its result and stats
+	stats = SearchStats(profile_cpu, trace_memory)
+
+	stats.start()
+	result = algorithm(grid, start, finish, stats.timed(visit) if visit else None)
+	stats.stop(result)
+
+	return result, stats
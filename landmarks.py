@@ -0,0 +1,204 @@
+import heapq
+import os
+import struct
+import sys
+import zlib
+from array import array
+from collections import deque
+from search import UNREACHED, chebyshev
+from visit_trace import little_endian
+
+# Number of landmarks picked by default
+LANDMARK_COUNT = 8
+
+# Layout of a landmark file: the header, the flat index of every landmark,
+# then the table from and the table to every landmark, all little endian int32
+MAGIC = b'PFLMARK1'
+HEADER = struct.Struct('<8sIIII')
+
+# Extension of the landmark file saved next to a map file
+LANDMARK_EXTENSION = '.landmarks'
+
+def landmark_file(map_file):
+	return os.path.splitext(map_file)[0] + LANDMARK_EXTENSION
+
+def map_digest(grid):
+	# Checksum of the walls and costs, the only things the tables depend on
+	return zlib.crc32(bytes(grid.costs), zlib.crc32(bytes(grid.walls)))
+
+def uniform_costs(grid):
+	size = grid.rows * grid.cols
+	return bytes(grid.costs).count(bytes([grid.costs[0]])) == size
+
+def distance_table(grid, source, reverse = False):
+	# Cost of the cheapest path from source to every cell, or from every cell
+	# to source with reverse. Cells that cannot be reached are UNREACHED.
+	costs = grid.costs
+	offsets = grid.offsets
+	adjacency = grid.adjacency
+	distances = array('i', [UNREACHED]) * (grid.rows * grid.cols)
+	distances[source] = 0
+
+	if uniform_costs(grid):
+		# Every step costs the same, so breadth first order is cheapest first
+		step = costs[0]
+		queue = deque([source])
+
+		while queue:
+			current = queue.popleft()
+			cost = distances[current] + step
+
+			for delta in offsets[adjacency[current]]:
+				neighbor = current + delta
+				if distances[neighbor] == UNREACHED:
+					distances[neighbor] = cost
+					queue.append(neighbor)
+
+		return distances
+
+	heap = [(0, source)]
+
+	while heap:
+		cost, current = heapq.heappop(heap)
+
+		if cost > distances[current]:
+			continue
+
+		for delta in offsets[adjacency[current]]:
+			neighbor = current + delta
+			total_cost = cost + (costs[current] if reverse else costs[neighbor])
+
+			if total_cost < distances[neighbor]:
+				distances[neighbor] = total_cost
+				heapq.heappush(heap, (total_cost, neighbor))
+
+	return distances
+
+def farthest(distances):
+	# Reachable cell with the largest distance
+	best = max((value for value in distances if value != UNREACHED), default = 0)
+	return distances.index(best)
+
+class Landmarks:
+	def __init__(self, grid, count = LANDMARK_COUNT, seed = None):
+		# ALT heuristic. Every landmark stores its distance to and from every
+		# cell, and the triangle inequality turns those into lower bounds on
+		# the distance between any two cells. Landmarks are picked one at a
+		# time as the cell farthest from the ones already picked, starting
+		# from the cell farthest from seed (the first open cell by default).
+		self.grid = grid
+		self.digest = map_digest(grid)
+		self.landmarks = []
+		self.forward = []
+		self.reverse = []
+		self.target = None
+		self.active = []
+
+		walls = bytes(grid.walls)
+		if seed is None:
+			seed = walls.find(b'\0')
+			if seed < 0:
+				return
+		else:
+			seed = grid.index(*seed)
+
+		uniform = uniform_costs(grid)
+		closest = distance_table(grid, seed)
+
+		for i in range(count):
+			landmark = farthest(closest)
+
+			if landmark in self.landmarks:
+				break
+
+			self.landmarks.append(landmark)
+			self.forward.append(distance_table(grid, landmark))
+
+			# With uniform costs the distance is the same both ways
+			self.reverse.append(self.forward[-1] if uniform else distance_table(grid, landmark, True))
+
+			closest = array('i', map(min, closest if i else self.forward[-1], self.forward[-1]))
+
+	def is_current(self, grid):
+		# Whether the tables still match the walls and costs of grid
+		return grid.rows == self.grid.rows and grid.cols == self.grid.cols and map_digest(grid) == self.digest
+
+	def aim(self, target):
+		# Keeps the distances between the target and every landmark that can
+		# reach it and be reached from it, since they are the same for every cell
+		self.target = target
+		self.active = [(forward, reverse, forward[target], reverse[target]) for forward, reverse in zip(self.forward, self.reverse)
+			if forward[target] != UNREACHED and reverse[target] != UNREACHED]
+
+	def heuristic(self, grid, index, target):
+		# Lower bound on the cost from index to target, for search.a_star
+		if target != self.target:
+			self.aim(target)
+
+		best = chebyshev(grid, index, target)
+
+		for forward, reverse, from_landmark, to_landmark in self.active:
+			bound = max(from_landmark - forward[index], reverse[index] - to_landmark)
+			if bound > best:
+				best = bound
+
+		return best
+
+	def save(self, filename):
+		with open(filename, 'wb') as file:
+			file.write(HEADER.pack(MAGIC, self.grid.rows, self.grid.cols, len(self.landmarks), self.digest))
+			file.write(little_endian(array('i', self.landmarks)))
+
+			for table in self.forward + self.reverse:
+				file.write(little_endian(table))
+
+	@classmethod
+	def load(cls, filename, grid):
+		# Reads tables saved for grid. Returns None if they were computed for
+		# other walls or costs.
+		with open(filename, 'rb') as file:
+			magic, rows, cols, count, digest = HEADER.unpack(file.read(HEADER.size))
+
+			if magic != MAGIC:
+				raise ValueError("{} is not a landmark file".format(filename))
+
+			if (rows, cols, digest) != (grid.rows, grid.cols, map_digest(grid)):
+				return None
+
+			def read(length):
+				values = array('i')
+				values.frombytes(file.read(length * 4))
+
+				if sys.byteorder == 'big':
+					values.byteswap()
+
+				return values
+
+			landmarks = cls.__new__(cls)
+			landmarks.grid = grid
+			landmarks.digest = digest
+			landmarks.landmarks = list(read(count))
+			landmarks.forward = [read(rows * cols) for i in range(count)]
+			landmarks.reverse = [read(rows * cols) for i in range(count)]
+			landmarks.target = None
+			landmarks.active = []
+
+			return landmarks
+
+	@classmethod
+	def for_grid(cls, grid, filename, count = LANDMARK_COUNT, save = True):
+		# Loads the tables saved for grid, computing them again only if the
+		# file is missing or the walls have changed, and then saving them
+		# unless save is False
+		try:
+			landmarks = cls.load(filename, grid)
+		except (OSError, ValueError, struct.error):
+			landmarks = None
+
+		if landmarks is None:
+			landmarks = cls(grid, count)
+
+			if save:
+				landmarks.save(filename)
+
+		return landmarks
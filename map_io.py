@@ -0,0 +1,211 @@
+import mmap
+import struct
+from search import SearchGrid
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# Layout of a map file: the header, the walls packed eight cells to a byte
+# (cell i is bit i % 8 of byte i // 8), then if the flags say so the cost and
+# the neighbor mask of every cell, one byte each. Every section is padded to
+# a multiple of 4 bytes. start and finish are flat indices, -1 when unset.
+MAGIC = b'PFMAP001'
+HEADER = struct.Struct('<8sIIiiI')
+
+# Flags of the header
+HAS_COSTS = 1
+HAS_MASKS = 2
+
+# Bytes of one cell per bit, for packing and unpacking walls without numpy
+UNPACKED = [bytes((value >> bit) & 1 for bit in range(8)) for value in range(256)]
+PACKED = {cells: value for value, cells in enumerate(UNPACKED)}
+
+def padding(size):
+	return -size % 4
+
+def pack_walls(walls):
+	# Packs one byte per cell, 0 or 1, into one bit per cell
+	if np is not None:
+		return np.packbits(np.frombuffer(walls, dtype = np.uint8), bitorder = 'little').tobytes()
+
+	walls = bytes(walls) + bytes(-len(walls) % 8)
+	return bytes(PACKED[walls[i:i + 8]] for i in range(0, len(walls), 8))
+
+def unpack_walls(packed, size):
+	if np is not None:
+		return bytearray(np.unpackbits(np.frombuffer(packed, dtype = np.uint8), count = size, bitorder = 'little').tobytes())
+
+	return bytearray(b''.join(map(UNPACKED.__getitem__, packed))[:size])
+
+def save(filename, grid, start = None, finish = None, masks = True):
+	# Writes the walls and costs of a grid. The costs are left out when they
+	# are all 1. With masks the neighbor masks are written too, so loading
+	# does not have to compute them again.
+	size = grid.rows * grid.cols
+	walls = pack_walls(bytes(grid.walls))
+	costs = bytes(grid.costs)
+	flags = 0
+
+	if costs.count(1) != size:
+		flags |= HAS_COSTS
+
+	if masks:
+		flags |= HAS_MASKS
+
+	with open(filename, 'wb') as file:
+		file.write(HEADER.pack(MAGIC, grid.rows, grid.cols, grid.index(*start) if start else -1,
+			grid.index(*finish) if finish else -1, flags))
+		file.write(walls)
+		file.write(bytes(padding(len(walls))))
+
+		if flags & HAS_COSTS:
+			file.write(costs)
+			file.write(bytes(padding(size)))
+
+		if flags & HAS_MASKS:
+			file.write(bytes(grid.adjacency))
+
+class MapFile:
+	def __init__(self, filename):
+		# Memory maps a map file. The mapping is copy on write, so the cost and
+		# mask views can be used as the tables of a grid and edited without
+		# changing the file.
+		with open(filename, 'rb') as file:
+			self.map = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_COPY)
+
+		magic, self.rows, self.cols, start, finish, self.flags = HEADER.unpack_from(self.map)
+
+		if magic != MAGIC:
+			self.map.close()
+			raise ValueError("{} is not a map file".format(filename))
+
+		self.start = divmod(start, self.cols) if start >= 0 else None
+		self.finish = divmod(finish, self.cols) if finish >= 0 else None
+
+		size = self.rows * self.cols
+		packed_size = -(-size // 8)
+		view = memoryview(self.map)
+		offset = HEADER.size
+
+		self.packed_walls = view[offset:offset + packed_size]
+		offset += packed_size + padding(packed_size)
+
+		self.costs = None
+		if self.flags & HAS_COSTS:
+			self.costs = view[offset:offset + size]
+			offset += size + padding(size)
+
+		self.masks = view[offset:offset + size] if self.flags & HAS_MASKS else None
+
+	def walls(self):
+		return unpack_walls(self.packed_walls, self.rows * self.cols)
+
+	def grid(self):
+		# Builds a search grid from the file. The costs and masks stay in the
+		# mapping, so only the walls are read up front.
+		size = self.rows * self.cols
+		walls = self.walls()
+
+		if self.masks is None:
+			grid = SearchGrid(self.rows, self.cols)
+			grid.load_walls(walls)
+		else:
+			grid = SearchGrid.from_buffers(self.rows, self.cols, walls, bytearray([1]) * size, self.masks)
+
+		if self.costs is not None:
+			grid.costs = self.costs
+
+		return grid
+
+	def close(self):
+		# The views have to be released before the mapping can be closed
+		self.packed_walls.release()
+
+		for view in (self.costs, self.masks):
+			if view is not None:
+				view.release()
+
+		self.map.close()
+
+def load(filename):
+	# Reads a map file. Returns the grid, start and finish.
+	map_file = MapFile(filename)
+	return map_file.grid(), map_file.start, map_file.finish
+
+# Characters of MovingAI maps that can be walked on. Every other character
+# ('@', 'O', 'T', 'W') is a wall.
+MOVINGAI_OPEN = b'.GS'
+
+def load_movingai(filename):
+	# Reads a map in the MovingAI benchmark format
+	with open(filename, 'rb') as file:
+		header = {}
+
+		for line in file:
+			line = line.strip()
+
+			if line == b'map':
+				break
+
+			key, value = line.split(None, 1)
+			header[key.decode()] = value.decode()
+
+		rows = int(header['height'])
+		cols = int(header['width'])
+		text = b''.join(line.rstrip(b'\r\n') for line in file)
+
+	grid = SearchGrid(rows, cols)
+	grid.load_walls(text[:rows * cols].translate(bytes(0 if bytes([value]) in MOVINGAI_OPEN else 1 for value in range(256))))
+
+	return grid
+
+def save_movingai(filename, grid):
+	# Writes a map in the MovingAI benchmark format, walls as '@'. The
+	# format has no costs, so they are left out.
+	walls = bytes(grid.walls).translate(bytes.maketrans(b'\x00\x01', b'.@'))
+
+	with open(filename, 'wb') as file:
+		file.write('type octile\nheight {}\nwidth {}\nmap\n'.format(grid.rows, grid.cols).encode())
+
+		for row in range(grid.rows):
+			file.write(walls[row * grid.cols:(row + 1) * grid.cols] + b'\n')
+
+class Scenario:
+	def __init__(self, bucket, map_name, width, height, start, finish, optimal):
+		# One query of a MovingAI scenario file. start and finish are (row,
+		# col) pairs, the file itself stores them as x and y.
+		self.bucket = bucket
+		self.map_name = map_name
+		self.width = width
+		self.height = height
+		self.start = start
+		self.finish = finish
+		self.optimal = optimal
+
+def load_scenarios(filename):
+	scenarios = []
+
+	with open(filename) as file:
+		for line in file:
+			fields = line.split('\t')
+
+			# Skips the version line
+			if len(fields) < 9:
+				continue
+
+			bucket, map_name, width, height, start_x, start_y, finish_x, finish_y = fields[:8]
+			scenarios.append(Scenario(int(bucket), map_name, int(width), int(height),
+				(int(start_y), int(start_x)), (int(finish_y), int(finish_x)), float(fields[8])))
+
+	return scenarios
+
+def save_scenarios(filename, scenarios):
+	with open(filename, 'w') as file:
+		file.write('version 1\n')
+
+		for scenario in scenarios:
+			file.write('{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\n'.format(scenario.bucket, scenario.map_name,
+				scenario.width, scenario.height, scenario.start[1], scenario.start[0],
+				scenario.finish[1], scenario.finish[0], scenario.optimal))
@@ -1,34 +1,75 @@
-import heapq
-from collections import deque
-
-def dfs(grid, thread):
-	# Performs depth first search algorithm
-	start = grid.matrix[grid.start[0]][grid.start[1]]
-	finish = grid.matrix[grid.finish[0]][grid.finish[1]]
-	stack = deque()
-	stack.append(start)
-	found = False
-
-	while len(stack) > 0:
-		# Grabs the cell from the top of the stack
-		current = stack.pop()
-
-		# Exits the loop if the finish cell has been found
-		if current == finish:
-			found = True
-			break
-
-		# Marks the current cell as visited and fetches its neighbors
-		grid.visit(current)
-		neighbors = current.get_adjacent(grid)
-		for neighbor in neighbors:
-			if neighbor not in stack:
-				# Adds the neighbor to the stack
-				neighbor.parent = current
-				stack.append(neighbor)
+import time
+from functools import partial
+import search
+import wavefront
+import incremental
+import hpa
+import landmarks
+from constants import FPS, FORWARD_PATH, BACKWARD_PATH, MAP_FILE
+from visit_trace import TraceRecorder
+
+def option_key(value):
+	# Value of a search option in a cache key. A landmark heuristic stands
+	# for its tables, so tables loaded again from a file still find the
+	# results found with them.
+	tables = getattr(value, '__self__', None)
+
+	if isinstance(tables, landmarks.Landmarks):
+		return (tables.digest, tuple(tables.landmarks))
+
+	return value
+
+def build(thread, structure):
+	# Builds the tables or graph a search needs before it starts, counting
+	# the time in the stats of the search
+	started = time.perf_counter()
+	built = structure()
+	thread.stats.build_time += time.perf_counter() - started
+
+	return built
+
+def run_search(grid, name, algorithm, thread, bidirectional = False, **options):
+	# Runs a search from the search module on the grid's map. The grid
+	# subscribes to the visit stream so every expanded cell is drawn, and the
+	# stream is recorded so the run can be saved as a trace. name is the one
+	# shown on the start screen, and labels the trace and the cached results.
+	stats = thread.stats
+	recorder = TraceRecorder(grid.model, grid.visit, bidirectional)
+
+	# Bidirectional searches draw the cells expanded from each end in their own color
+	if bidirectional:
+		visits = (stats.timed(lambda row, col: recorder.visit(row, col, FORWARD_PATH)),
+			stats.timed(lambda row, col: recorder.visit_backward(row, col, BACKWARD_PATH)))
+	else:
+		visits = (stats.timed(recorder.visit),)
+
+	stats.start()
+
+	# Answers repeated queries on an unchanged map from the grid's cache.
+	# Options such as the heuristic change the result, so they are part of the key.
+	key = (name,) + tuple(sorted((option, option_key(value)) for option, value in options.items()))
+	result = grid.path_cache.get(grid, grid.start, grid.finish, key)
+
+	# The pause after every layer of a wavefront search is time spent
+	# showing it, not searching
+	if options.get('layer_done'):
+		options['layer_done'] = partial(stats.time_render, options['layer_done'])
+
+	if result is None and not grid.components.connected(grid, grid.start, grid.finish):
+		# Start and finish are in different regions, so there is nothing to search
+		result = search.SearchResult([], float('inf'), 0)
+	elif result is None:
+		result = algorithm(grid.model, grid.start, grid.finish, *visits, **options)
+		grid.path_cache.put(grid, grid.start, grid.finish, key, result)
+	else:
+		stats.cached = True
+		print("Found in the path cache ({hits} hits, {misses} misses, {evictions} evictions)".format(**grid.path_cache.as_dict()))
+
+	grid.last_run = (recorder, name, grid.start, grid.finish, result)
 
 	# Performs no more processing if the path has not been found
-	if not found:
+	if not result.found:
+		stats.stop(result)
 		print("Path Not Found!")
 		thread.path_not_found()
 		thread.turn_off()
@@ -36,195 +77,84 @@ def dfs(grid, thread):
 
 	thread.stop_search()
 
-	path = []
-	current = finish.parent
-
-	# Builds the path from start cell to finish cell
-	while current and current != start:
-		grid.mark_path(current)
-		path.append(current)
-		current = current.parent
+	# Draws the path from start cell to finish cell
+	stats.time_render(grid.draw_path, result.path)
+	stats.stop(result)
 
-	path.append(start)
-	grid.create_line_path(path)
+	if stats.profile:
+		print(stats.profile)
 
 	thread.turn_off()
-	
-def bfs(grid, thread):
-	# Performs breadth first search algorithm
-	start = grid.matrix[grid.start[0]][grid.start[1]]
-	finish = grid.matrix[grid.finish[0]][grid.finish[1]]
-	queue = deque()
-	queue.append(start)
-	found = False
-
-	while len(queue) > 0:
-		# Grabs cell from front of queue
-		current = queue.popleft()
-
-		# Exits the loop if the finish cell has been found
-		if current == finish:
-			found = True
-			break
-
-		# Marks the current cell as visited and adds its neighbors to the queue.
-		grid.visit(current)
-		neighbors = current.get_adjacent(grid)
-		for neighbor in neighbors:
-			if neighbor not in queue:
-				# Adds the neighbor to the queue
-				neighbor.parent = current
-				queue.append(neighbor)
-
-	# Performs no more processing if the path has not been found
-	if not found:
-		print("Path Not Found!")
-		thread.path_not_found()
-		thread.turn_off()
-		return
-
-	thread.stop_search()
-
-	# Builds the path from start cell to finish cell
-	path = []
-	current = finish.parent
-	while current and current != start:
-		grid.mark_path(current)
-		path.append(current)
-		current = current.parent
 
-	path.append(start)
-	grid.create_line_path(path)
+def dfs(grid, thread):
+	# Performs depth first search algorithm
+	run_search(grid, "DFS", search.dfs, thread)
 
-	thread.turn_off()
+def bfs(grid, thread):
+	# Performs breadth first search algorithm
+	run_search(grid, "BFS", search.bfs, thread)
 
-def dijkstras(grid, start, finish, thread):
+def dijkstras(grid, thread):
 	# Performs dijkstras algorithm
-	costs = dict()
-	visited = set()
-	heap = []
-
-	# Sets cost to get to every cell from the starting cell to infinity
-	for r in range(len(grid.matrix)):
-		for c in range(len(grid.matrix[0])):
-			cell = grid.matrix[r][c]
-			if cell.is_start():
-				costs[cell] = 0
-			else:
-				costs[cell] = float('inf')
-
-	# Creates an entry consisting of cost to get to current cell, coordinates on
-	# the window, and the current cell object. Adds this entry to the min heap.
-	entry = (costs[start], (start.X,start.Y), start)
-	heapq.heappush(heap,entry)
-	while len(heap) > 0 and finish not in visited:
-		# Grabs the cell with the minimum cost
-		cost,coords,cell = heapq.heappop(heap)
-		if cell not in visited:
-			# Visits the cell if it has not been visited
-			grid.visit(cell)
-			visited.add(cell)
-			neighbors = cell.get_adjacent(grid)
-			for neighbor in neighbors:
-				if neighbor not in visited:
-					# Calculates the cost to get to the neighbor cell
-					total_cost = costs[cell] + neighbor.cost
-					# Updates the cost of the neighbor cell if it is more than the totol cost
-					if costs[neighbor] > total_cost:
-						costs[neighbor] = total_cost
-						neighbor.parent = cell
-					entry = (costs[neighbor], (neighbor.X,neighbor.Y), neighbor)
-					# Adds the entry associated with the neighbor to the min heap
-					heapq.heappush(heap, entry)
-
-	# Performs no more processing if the path has not been found
-	if costs[finish] == float('inf'):
-		print("Path Not Found!")
-		thread.path_not_found()
-		thread.turn_off()
-		return
-
-	thread.stop_search()
-
-	# Builds the shortest path from start cell to finish cell
-	shortest_path = []
-	current = finish.parent
-	while current and current != start:
-		grid.mark_path(current)
-		shortest_path.append(current)
-		current = current.parent
-	shortest_path.append(start)
-	grid.create_line_path(shortest_path)
-
-	thread.turn_off()
+	run_search(grid, "Dijkstras", search.dijkstras, thread)
 
 def A_star(grid, thread):
 	# Performs A* algorithm
-	heap = []
-
-	start = grid.matrix[grid.start[0]][grid.start[1]]
-	finish = grid.matrix[grid.finish[0]][grid.finish[1]]
-
-	start.g = 0
-	start.h = abs(start.X - finish.X) + abs(start.Y - finish.Y)
-	start.f = start.g + start.h
-
-
-	# Creates an entry consisting of the f cost, coordinates of the cell on
-	# the window, and the current cell object. Adds this entry to the min heap.
-	entry = (start.f, (start.X,start.Y), start)
-	heapq.heappush(heap, entry)
-
-	found = False
-
-	while len(heap) > 0:
-		# Grabs the cell with the minimum cost
-		f_cost,coords,current =  heapq.heappop(heap)
-
-		# Exits the loop if the finish cell has been found
-		if current == finish:
-			found = True
-			break
-
-		# Visits the cell if it has not been visited
-		if current != start:
-			grid.visit(current)
-
-		# Fetches the neighbors of the current cell
-		neighbors = current.get_adjacent(grid)
-		for neighbor in neighbors:	
-			if neighbor.g > current.g + 1:
-				# Calculates the g cost which represents the distance between the start cell and
-				# the neighbor cell in in terms of tiles
-				neighbor.g = current.g + 1
-				# Calculates the h cost which is the Manhattan Distance between the neighbor cell and finish cell
-				neighbor.h = abs(neighbor.X - finish.X) + abs(neighbor.Y - finish.Y)
-				# Calculates the f cost which is the sum of the g cost and the h cost
-				neighbor.f = neighbor.g + neighbor.h
-				neighbor.parent = current
-
-				if neighbor not in heap:
-					# Adds the entry associated with the neighbor to the min heap
-					heapq.heappush(heap, (neighbor.f,(neighbor.X,neighbor.Y),neighbor))
-
-	# Performs no more processing if the path has not been found
-	if not found:
-		print("Path Not Found!")
-		thread.path_not_found()
-		thread.turn_off()
-		return
-
-	thread.stop_search()
-		
-	# Builds the shortest path from start cell to finish cell
-	shortest_path = []
-	current = finish.parent
-	while current and current != start:
-		grid.mark_path(current)
-		shortest_path.append(current)
-		current = current.parent
-	shortest_path.append(start)
-	grid.create_line_path(shortest_path)
-
-	thread.turn_off()
-
+	run_search(grid, "A*", search.a_star, thread)
+
+def alt_a_star(grid, thread):
+	# Performs A* with the landmark heuristic. The landmark tables are kept by
+	# the grid and only computed again once the walls have changed, unless
+	# the tables saved with the map file match them.
+	if grid.landmarks is None or not grid.landmarks.is_current(grid.model):
+		grid.landmarks = build(thread, lambda: landmarks.Landmarks.for_grid(grid.model, landmarks.landmark_file(MAP_FILE), save = False))
+
+	run_search(grid, "ALT A*", search.a_star, thread, heuristic = grid.landmarks.heuristic)
+
+def jps(grid, thread):
+	# Performs Jump Point Search
+	run_search(grid, "JPS", search.jps, thread)
+
+def bidirectional_bfs(grid, thread):
+	# Performs breadth first search from both ends
+	run_search(grid, "Bidirectional BFS", search.bidirectional_bfs, thread, True)
+
+def bidirectional_a_star(grid, thread):
+	# Performs A* from both ends
+	run_search(grid, "Bidirectional A*", search.bidirectional_a_star, thread, True)
+
+def wait_for_frame():
+	time.sleep(1 / FPS)
+
+def wavefront_bfs(grid, thread):
+	# Performs breadth first search a layer at a time, showing one layer per frame
+	run_search(grid, "Wavefront BFS", wavefront.wavefront, thread, layer_done = wait_for_frame if thread.animate else None)
+
+def lpa_star(grid, thread):
+	# Performs Lifelong Planning A*. The planner is kept by the grid so walls
+	# edited after the search only repair the part of the path they affect.
+	grid.planner = incremental.LPAStar(grid.model, grid.start, grid.finish)
+	run_search(grid, "LPA*", grid.planner.search, thread)
+
+def hpa_star(grid, thread):
+	# Performs hierarchical A*. The cluster graph is built by the first search
+	# and then only rebuilt around the walls that change.
+	if grid.hierarchy is None or grid.hierarchy.grid is not grid.model:
+		grid.hierarchy = build(thread, lambda: hpa.HierarchicalMap(grid.model))
+
+	run_search(grid, "HPA*", grid.hierarchy.search, thread)
+
+# Algorithms offered on the start screen, by the name shown there
+ALGORITHMS = {
+	"Dijkstras": dijkstras,
+	"A*": A_star,
+	"DFS": dfs,
+	"BFS": bfs,
+	"ALT A*": alt_a_star,
+	"JPS": jps,
+	"Bidirectional BFS": bidirectional_bfs,
+	"Bidirectional A*": bidirectional_a_star,
+	"Wavefront BFS": wavefront_bfs,
+	"LPA*": lpa_star,
+	"HPA*": hpa_star,
+}
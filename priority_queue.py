@@ -0,0 +1,132 @@
+# Frontiers for the searches that pop the cheapest cell first. Every queue
+# holds flat cell indices with integer priorities and supports the same
+# operations: push(item, priority) adds an item or lowers the priority of
+# one already queued, pop() removes and returns the (priority, item) pair with
+# the lowest priority, and len() and in work as for a set of the items.
+# Neither queue ever holds an item twice, so their size grows with the cells
+# reached and not with the number of times a cell is relaxed.
+
+class IndexedHeap:
+	def __init__(self):
+		# Binary heap of (priority, item) pairs that knows where every item
+		# is, so decreasing a priority moves the existing entry. Ties are
+		# broken by the smaller item, like a heap of tuples.
+		self.heap = []
+		self.positions = {}
+
+	def __len__(self):
+		return len(self.heap)
+
+	def __contains__(self, item):
+		return item in self.positions
+
+	def push(self, item, priority):
+		position = self.positions.get(item)
+
+		if position is None:
+			self.heap.append((priority, item))
+			self.sift_up(len(self.heap) - 1)
+		elif (priority, item) < self.heap[position]:
+			self.heap[position] = (priority, item)
+			self.sift_up(position)
+
+	def pop(self):
+		heap = self.heap
+		top = heap[0]
+		last = heap.pop()
+		del self.positions[top[1]]
+
+		if heap:
+			heap[0] = last
+			self.sift_down(0)
+
+		return top
+
+	def sift_up(self, position):
+		heap = self.heap
+		positions = self.positions
+		entry = heap[position]
+
+		while position > 0:
+			parent = (position - 1) >> 1
+
+			if heap[parent] <= entry:
+				break
+
+			heap[position] = heap[parent]
+			positions[heap[position][1]] = position
+			position = parent
+
+		heap[position] = entry
+		positions[entry[1]] = position
+
+	def sift_down(self, position):
+		heap = self.heap
+		positions = self.positions
+		entry = heap[position]
+		size = len(heap)
+
+		while True:
+			child = 2 * position + 1
+
+			if child >= size:
+				break
+
+			if child + 1 < size and heap[child + 1] < heap[child]:
+				child += 1
+
+			if entry <= heap[child]:
+				break
+
+			heap[position] = heap[child]
+			positions[heap[position][1]] = position
+			position = child
+
+		heap[position] = entry
+		positions[entry[1]] = position
+
+class BucketQueue:
+	def __init__(self):
+		# Dial's algorithm: one bucket per priority, scanned upwards from the
+		# lowest one that may be non empty. Pushes and pops take constant
+		# time, plus the scan over empty buckets, which is short when the step
+		# costs are small integers. Items of a bucket come out in the order
+		# they were pushed.
+		self.buckets = {}
+		self.priorities = {}
+		self.lowest = 0
+
+	def __len__(self):
+		return len(self.priorities)
+
+	def __contains__(self, item):
+		return item in self.priorities
+
+	def push(self, item, priority):
+		old = self.priorities.get(item)
+
+		if old is not None:
+			if priority >= old:
+				return
+
+			del self.buckets[old][item]
+
+		self.priorities[item] = priority
+		self.buckets.setdefault(priority, {})[item] = None
+
+		if priority < self.lowest or len(self.priorities) == 1:
+			self.lowest = priority
+
+	def pop(self):
+		buckets = self.buckets
+
+		while not buckets.get(self.lowest):
+			buckets.pop(self.lowest, None)
+			self.lowest += 1
+
+		bucket = buckets[self.lowest]
+		item = next(iter(bucket))
+		del bucket[item]
+		del self.priorities[item]
+
+		return self.lowest, item
@@ -0,0 +1,777 @@
+import heapq
+from array import array
+from collections import deque
+from priority_queue import IndexedHeap
+
+# Offsets of the eight adjacent cells, in the order they are explored
+DIRECTIONS = ((1, 0), (1, -1), (0, -1), (-1, 1), (-1, 0), (-1, -1), (0, 1), (1, 1))
+
+# Position in DIRECTIONS of the opposite of every direction
+OPPOSITE = [DIRECTIONS.index((-dr, -dc)) for dr, dc in DIRECTIONS]
+
+# Swaps wall flags for passable flags
+INVERT = bytes.maketrans(b'\x00\x01', b'\x01\x00')
+
+# Value of the g cost table for cells the current search has not reached
+UNREACHED = 2 ** 31 - 1
+
+# Largest value of a stamp table
+MAX_STAMP = 2 ** 32 - 1
+
+def neighbor_offsets(cols):
+	# For every 8-bit passability mask, the flat index offsets of the
+	# neighbors it allows. Bit k of a mask stands for DIRECTIONS[k].
+	deltas = [dr * cols + dc for dr, dc in DIRECTIONS]
+	return [tuple(delta for bit, delta in enumerate(deltas) if mask >> bit & 1) for mask in range(256)]
+
+def update_ring(adjacency, rows, cols, index, passable):
+	# Updates the masks of the cells around index after it became passable
+	# or a wall. No other mask refers to the cell.
+	row, col = divmod(index, cols)
+
+	for bit, (dr, dc) in enumerate(DIRECTIONS):
+		r = row + dr
+		c = col + dc
+
+		if 0 <= r < rows and 0 <= c < cols:
+			back = 1 << OPPOSITE[bit]
+
+			if passable:
+				adjacency[r * cols + c] |= back
+			else:
+				adjacency[r * cols + c] &= ~back & 0xFF
+
+class SearchGrid:
+	def __init__(self, rows, cols):
+		# Plain description of the map: one wall flag and one cost per cell,
+		# addressed by the flat index row * cols + col
+		self.rows = rows
+		self.cols = cols
+		self.walls = bytearray(rows * cols)
+		self.costs = bytearray([1]) * (rows * cols)
+
+		# Passability mask of the eight neighbors of every cell, kept up to date
+		# by set_wall, and the neighbor offsets of every mask
+		self.offsets = neighbor_offsets(cols)
+		self.rebuild_adjacency()
+
+		self.allocate_tables()
+
+	@classmethod
+	def from_string(cls, text):
+		# Builds a grid from the text produced by Grid.__str__ ('-' is a wall,
+		# 'R' the start, 'G' the finish). Returns the grid, start and finish.
+		lines = [line for line in text.splitlines() if line]
+		grid = cls(len(lines), len(lines[0]))
+		start = finish = None
+
+		for r, line in enumerate(lines):
+			for c, char in enumerate(line):
+				if char == 'R':
+					start = (r, c)
+				elif char == 'G':
+					finish = (r, c)
+
+		grid.load_walls(bytearray(1 if char == '-' else 0 for char in ''.join(lines)))
+
+		return grid, start, finish
+
+	@classmethod
+	def from_buffers(cls, rows, cols, walls, costs, adjacency):
+		# Builds a grid over existing wall, cost and mask buffers without
+		# copying them, such as views of shared memory. Only the parent and g
+		# tables belong to the new grid.
+		grid = cls.__new__(cls)
+		grid.rows = rows
+		grid.cols = cols
+		grid.walls = walls
+		grid.costs = costs
+		grid.adjacency = adjacency
+		grid.offsets = neighbor_offsets(cols)
+		grid.allocate_tables()
+
+		return grid
+
+	def index(self, row, col):
+		return row * self.cols + col
+
+	def coords(self, index):
+		return divmod(index, self.cols)
+
+	def is_wall(self, coords):
+		return self.walls[self.index(*coords)] == 1
+
+	def set_wall(self, coords, wall = True):
+		index = self.index(*coords)
+		value = 1 if wall else 0
+
+		if self.walls[index] != value:
+			self.walls[index] = value
+			update_ring(self.adjacency, self.rows, self.cols, index, not wall)
+
+	def set_walls(self, cells, wall = True):
+		# Changes many cells at once. The masks are computed again for the
+		# whole map when that is cheaper than updating the ring of every cell.
+		value = 1 if wall else 0
+		indices = [index for index in (self.index(*coords) for coords in cells) if self.walls[index] != value]
+
+		for index in indices:
+			self.walls[index] = value
+
+		if len(indices) > len(self.walls) // 8:
+			self.rebuild_adjacency()
+		else:
+			for index in indices:
+				update_ring(self.adjacency, self.rows, self.cols, index, not wall)
+
+	def load_walls(self, walls):
+		# Replaces every wall flag at once
+		self.walls = bytearray(walls)
+		self.rebuild_adjacency()
+
+	def clear(self):
+		# Removes every wall from the grid
+		self.load_walls(bytearray(self.rows * self.cols))
+
+	def rebuild_adjacency(self):
+		# Computes every mask at once. The map is held as one big integer with
+		# a byte per cell, so a shift lines every cell up with one neighbor.
+		size = self.rows * self.cols
+		cols = self.cols
+		free = int.from_bytes(bytes(self.walls).translate(INVERT), 'little')
+		everything = (1 << (size * 8)) - 1
+		masks = 0
+
+		for bit, (dr, dc) in enumerate(DIRECTIONS):
+			delta = dr * cols + dc
+			shifted = free >> (delta * 8) if delta >= 0 else free << (-delta * 8)
+
+			# Drops the neighbors that would wrap around to another row
+			row = bytes(1 if 0 <= c + dc < cols else 0 for c in range(cols))
+			shifted &= int.from_bytes(row * self.rows, 'little') & everything
+
+			masks |= shifted << bit
+
+		self.adjacency = bytearray(masks.to_bytes(size, 'little'))
+
+	def allocate_tables(self):
+		# Parent and g cost of every cell, written by the searches. Every
+		# search has its own generation, and an entry only counts if the
+		# cell's stamp is that generation, or one more once the search has
+		# closed the cell. Starting a search leaves the tables as they are.
+		size = self.rows * self.cols
+		self.parents = array('i', [-1]) * size
+		self.g = array('i', [UNREACHED]) * size
+		self.stamps = array('I', [0]) * size
+		self.generation = 0
+
+		# Tables of the backward half of a bidirectional search, made on first use
+		self.backward = None
+
+	def search_tables(self):
+		# Starts a new search. Returns the parent, g cost and stamp tables and
+		# the generation of the search.
+		self.generation += 2
+
+		# Clears the stamps once every few billion searches when they run out
+		if self.generation + 1 > MAX_STAMP:
+			size = self.rows * self.cols
+			self.stamps[:] = array('I', [0]) * size
+			if self.backward:
+				self.backward[2][:] = array('I', [0]) * size
+
+			self.generation = 2
+
+		return self.parents, self.g, self.stamps, self.generation
+
+	def backward_tables(self):
+		# Parent, g cost and stamp tables for the search from the finish cell,
+		# stamped with the generation of the current search
+		if self.backward is None:
+			size = self.rows * self.cols
+			self.backward = (array('i', [-1]) * size, array('i', [UNREACHED]) * size, array('I', [0]) * size)
+
+		return self.backward
+
+	def reached(self, index):
+		# Whether the current search has reached the cell
+		return self.stamps[index] >= self.generation
+
+	def get_adjacent(self, index):
+		# Finds the flat indices of the adjacent cells that are not walls
+		return [index + delta for delta in self.offsets[self.adjacency[index]]]
+
+	def __str__(self):
+		rows = []
+
+		for r in range(self.rows):
+			offset = r * self.cols
+			rows.append(''.join('-' if wall else '.' for wall in self.walls[offset:offset + self.cols]))
+
+		return '\n'.join(rows) + '\n'
+
+class SearchResult:
+	def __init__(self, path, cost, expanded, max_frontier = 0, pushes = 0, duplicate_pushes = 0, neighbor_calls = 0):
+		# path is a list of (row, col) from start to finish, empty if there is none.
+		# duplicate_pushes counts frontier entries added for cells that already had one.
+		self.path = path
+		self.cost = cost
+		self.expanded = expanded
+		self.max_frontier = max_frontier
+		self.pushes = pushes
+		self.duplicate_pushes = duplicate_pushes
+		self.neighbor_calls = neighbor_calls
+
+	@property
+	def found(self):
+		return len(self.path) > 0
+
+def build_result(grid, parents, source, target, expanded, **counters):
+	# Follows the parent links back from the finish cell
+	if not grid.reached(target):
+		return SearchResult([], float('inf'), expanded, **counters)
+
+	path = []
+	cost = 0
+	current = target
+
+	while current != source:
+		path.append(grid.coords(current))
+		cost += grid.costs[current]
+		current = parents[current]
+
+	path.append(grid.coords(source))
+	path.reverse()
+
+	return SearchResult(path, cost, expanded, **counters)
+
+def dfs(grid, start, finish, visit = None):
+	# Performs depth first search algorithm. visit(row, col) is called for
+	# every cell in the order it is expanded.
+	source = grid.index(*start)
+	target = grid.index(*finish)
+	parents, g, stamps, mark = grid.search_tables()
+	parents[source] = source
+	offsets = grid.offsets
+	adjacency = grid.adjacency
+
+	# Cells stamped with the search's generation have been pushed
+	stamps[source] = mark
+
+	stack = deque()
+	stack.append(source)
+	expanded = 0
+	max_frontier = 1
+	pushes = 1
+	duplicate_pushes = 0
+	neighbor_calls = 0
+
+	while len(stack) > 0:
+		# Grabs the cell from the top of the stack
+		current = stack.pop()
+
+		# Exits the loop if the finish cell has been found
+		if current == target:
+			break
+
+		# Marks the current cell as visited and fetches its neighbors
+		expanded += 1
+		if visit:
+			visit(*grid.coords(current))
+
+		neighbor_calls += 1
+		for delta in offsets[adjacency[current]]:
+			neighbor = current + delta
+			if stamps[neighbor] != mark:
+				# Adds the neighbor to the stack
+				stamps[neighbor] = mark
+				parents[neighbor] = current
+				stack.append(neighbor)
+				pushes += 1
+
+		max_frontier = max(max_frontier, len(stack))
+
+	return build_result(grid, parents, source, target, expanded, max_frontier = max_frontier,
+		pushes = pushes, duplicate_pushes = duplicate_pushes, neighbor_calls = neighbor_calls)
+
+def bfs(grid, start, finish, visit = None):
+	# Performs breadth first search algorithm
+	source = grid.index(*start)
+	target = grid.index(*finish)
+	parents, g, stamps, mark = grid.search_tables()
+	parents[source] = source
+	offsets = grid.offsets
+	adjacency = grid.adjacency
+
+	# Cells stamped with the search's generation have been queued
+	stamps[source] = mark
+
+	queue = deque()
+	queue.append(source)
+	expanded = 0
+	max_frontier = 1
+	pushes = 1
+	duplicate_pushes = 0
+	neighbor_calls = 0
+
+	while len(queue) > 0:
+		# Grabs cell from front of queue
+		current = queue.popleft()
+
+		# Exits the loop if the finish cell has been found
+		if current == target:
+			break
+
+		# Marks the current cell as visited and adds its neighbors to the queue
+		expanded += 1
+		if visit:
+			visit(*grid.coords(current))
+
+		neighbor_calls += 1
+		for delta in offsets[adjacency[current]]:
+			neighbor = current + delta
+			if stamps[neighbor] != mark:
+				stamps[neighbor] = mark
+				parents[neighbor] = current
+				queue.append(neighbor)
+				pushes += 1
+
+		max_frontier = max(max_frontier, len(queue))
+
+	return build_result(grid, parents, source, target, expanded, max_frontier = max_frontier,
+		pushes = pushes, duplicate_pushes = duplicate_pushes, neighbor_calls = neighbor_calls)
+
+def dijkstras(grid, start, finish, visit = None, queue = IndexedHeap):
+	# Performs dijkstras algorithm. queue is the class of the frontier, see
+	# priority_queue. BucketQueue suits maps whose costs are small integers.
+	source = grid.index(*start)
+	target = grid.index(*finish)
+	parents, g, stamps, mark = grid.search_tables()
+	parents[source] = source
+	offsets = grid.offsets
+	adjacency = grid.adjacency
+	costs = grid.costs
+	frontier = queue()
+
+	# Cells stamped mark have a cost from this search, mark + 1 have been visited
+	visited = mark + 1
+	stamps[source] = mark
+	expanded = 0
+	max_frontier = 1
+	pushes = 1
+	neighbor_calls = 0
+
+	g[source] = 0
+
+	# Cells are queued once and their priority lowered when a cheaper route is found
+	frontier.push(source, 0)
+	while len(frontier) > 0:
+		# Grabs the cell with the minimum cost
+		cost, current = frontier.pop()
+
+		if current == target:
+			break
+
+		# Visits the cell
+		stamps[current] = visited
+		expanded += 1
+		if visit:
+			visit(*grid.coords(current))
+
+		neighbor_calls += 1
+		for delta in offsets[adjacency[current]]:
+			neighbor = current + delta
+			stamp = stamps[neighbor]
+
+			if stamp != visited:
+				# Updates the cost of the neighbor cell if it has none yet or it is more than the total cost
+				total_cost = cost + costs[neighbor]
+
+				if stamp != mark or g[neighbor] > total_cost:
+					stamps[neighbor] = mark
+					g[neighbor] = total_cost
+					parents[neighbor] = current
+					frontier.push(neighbor, total_cost)
+					pushes += 1
+
+		max_frontier = max(max_frontier, len(frontier))
+
+	return build_result(grid, parents, source, target, expanded, max_frontier = max_frontier,
+		pushes = pushes, neighbor_calls = neighbor_calls)
+
+def manhattan(grid, index, target):
+	row, col = divmod(index, grid.cols)
+	target_row, target_col = divmod(target, grid.cols)
+
+	return abs(row - target_row) + abs(col - target_col)
+
+def a_star(grid, start, finish, visit = None, heuristic = manhattan, queue = IndexedHeap):
+	# Performs A* algorithm. heuristic(grid, index, target) estimates the
+	# cost from a cell to the finish cell, see landmarks for an admissible
+	# one. queue is the class of the frontier, see priority_queue.
+	source = grid.index(*start)
+	target = grid.index(*finish)
+	parents, g, stamps, mark = grid.search_tables()
+	parents[source] = source
+	offsets = grid.offsets
+	adjacency = grid.adjacency
+	g[source] = 0
+	frontier = queue()
+
+	# Cells stamped mark have a g cost from this search, closed ones mark + 1
+	closed = mark + 1
+	stamps[source] = mark
+
+	# Priorities are the g cost plus the estimated cost to the finish cell,
+	# the Manhattan Distance by default
+	frontier.push(source, heuristic(grid, source, target))
+	expanded = 0
+	max_frontier = 1
+	pushes = 1
+	duplicate_pushes = 0
+	neighbor_calls = 0
+
+	while len(frontier) > 0:
+		# Grabs the cell with the minimum cost
+		f_cost, current = frontier.pop()
+
+		# Exits the loop if the finish cell has been found
+		if current == target:
+			break
+
+		stamps[current] = closed
+		expanded += 1
+		if visit:
+			visit(*grid.coords(current))
+
+		neighbor_calls += 1
+		for delta in offsets[adjacency[current]]:
+			neighbor = current + delta
+			total_cost = g[current] + grid.costs[neighbor]
+			stamp = stamps[neighbor]
+
+			if stamp < mark or total_cost < g[neighbor]:
+				# Reopens the neighbor since the heuristic is not consistent on
+				# diagonal moves
+				if stamp == closed:
+					duplicate_pushes += 1
+
+				stamps[neighbor] = mark
+				g[neighbor] = total_cost
+				parents[neighbor] = current
+				frontier.push(neighbor, total_cost + heuristic(grid, neighbor, target))
+				pushes += 1
+
+		max_frontier = max(max_frontier, len(frontier))
+
+	return build_result(grid, parents, source, target, expanded, max_frontier = max_frontier,
+		pushes = pushes, duplicate_pushes = duplicate_pushes, neighbor_calls = neighbor_calls)
+
+# Bit of every direction in a passability mask
+BITS = {direction: 1 << bit for bit, direction in enumerate(DIRECTIONS)}
+
+def forced_checks(dr, dc):
+	# Forced neighbor rules of Jump Point Search when moving in direction
+	# (dr, dc). Each rule is (wall bit, free bit, direction): the direction is
+	# forced when the wall bit is clear and the free bit is set.
+	if dr and dc:
+		return ((BITS[(-dr, 0)], BITS[(-dr, dc)], (-dr, dc)), (BITS[(0, -dc)], BITS[(dr, -dc)], (dr, -dc)))
+	elif dr:
+		return ((BITS[(0, 1)], BITS[(dr, 1)], (dr, 1)), (BITS[(0, -1)], BITS[(dr, -1)], (dr, -1)))
+	else:
+		return ((BITS[(1, 0)], BITS[(1, dc)], (1, dc)), (BITS[(-1, 0)], BITS[(-1, dc)], (-1, dc)))
+
+FORCED = {direction: forced_checks(*direction) for direction in DIRECTIONS}
+
+def chebyshev(grid, index, target):
+	row, col = divmod(index, grid.cols)
+	target_row, target_col = divmod(target, grid.cols)
+
+	return max(abs(row - target_row), abs(col - target_col))
+
+def sign(value):
+	return (value > 0) - (value < 0)
+
+def jps(grid, start, finish, visit = None):
+	# Performs Jump Point Search, an A* that skips over the cells between
+	# jump points. It assumes every cell costs the same to enter, like the
+	# default grid, and diagonal moves may squeeze between two walls just as
+	# the other searches do.
+	source = grid.index(*start)
+	target = grid.index(*finish)
+	parents, g, stamps, mark = grid.search_tables()
+	parents[source] = source
+	adjacency = grid.adjacency
+	cols = grid.cols
+	g[source] = 0
+	heap = []
+
+	# Cells stamped mark have a g cost from this search, closed ones mark + 1
+	closed = mark + 1
+	stamps[source] = mark
+
+	heapq.heappush(heap, (chebyshev(grid, source, target), source))
+	expanded = 0
+	max_frontier = 1
+	pushes = 1
+	duplicate_pushes = 0
+	neighbor_calls = 0
+
+	def jump(current, dr, dc):
+		# Moves from current in direction (dr, dc) until it reaches the finish
+		# cell, a cell with a forced neighbor or a dead end
+		bit = BITS[(dr, dc)]
+		delta = dr * cols + dc
+		forced = FORCED[(dr, dc)]
+
+		while adjacency[current] & bit:
+			current += delta
+
+			if current == target:
+				return current
+
+			mask = adjacency[current]
+			for wall_bit, free_bit, direction in forced:
+				if not mask & wall_bit and mask & free_bit:
+					return current
+
+			# A diagonal move stops where a straight jump finds a jump point
+			if dr and dc and (jump(current, dr, 0) is not None or jump(current, 0, dc) is not None):
+				return current
+
+		return None
+
+	while len(heap) > 0:
+		f_cost, current = heapq.heappop(heap)
+
+		if current == target:
+			break
+
+		if stamps[current] == closed:
+			continue
+
+		stamps[current] = closed
+		expanded += 1
+		if visit:
+			visit(*grid.coords(current))
+
+		# Prunes the directions that a path through the parent covers just as well
+		mask = adjacency[current]
+		if current == source:
+			directions = DIRECTIONS
+		else:
+			row, col = divmod(current, cols)
+			parent_row, parent_col = divmod(parents[current], cols)
+			dr, dc = sign(row - parent_row), sign(col - parent_col)
+
+			directions = [(dr, dc)]
+			if dr and dc:
+				directions += [(dr, 0), (0, dc)]
+
+			for wall_bit, free_bit, direction in FORCED[(dr, dc)]:
+				if not mask & wall_bit and mask & free_bit:
+					directions.append(direction)
+
+		for direction in directions:
+			if not mask & BITS[direction]:
+				continue
+
+			neighbor_calls += 1
+			neighbor = jump(current, *direction)
+			if neighbor is None:
+				continue
+
+			total_cost = g[current] + chebyshev(grid, current, neighbor)
+			if stamps[neighbor] < mark or total_cost < g[neighbor]:
+				if stamps[neighbor] >= mark:
+					duplicate_pushes += 1
+
+				stamps[neighbor] = mark
+				g[neighbor] = total_cost
+				parents[neighbor] = current
+				heapq.heappush(heap, (total_cost + chebyshev(grid, neighbor, target), neighbor))
+				pushes += 1
+
+		max_frontier = max(max_frontier, len(heap))
+
+	# Fills in the cells between consecutive jump points
+	if stamps[target] >= mark:
+		current = target
+		while current != source:
+			parent = parents[current]
+			row, col = divmod(current, cols)
+			parent_row, parent_col = divmod(parent, cols)
+			step = sign(parent_row - row) * cols + sign(parent_col - col)
+
+			while current != parent:
+				parents[current] = current + step
+				current += step
+
+	return build_result(grid, parents, source, target, expanded, max_frontier = max_frontier,
+		pushes = pushes, duplicate_pushes = duplicate_pushes, neighbor_calls = neighbor_calls)
+
+def join_paths(grid, parents, backward_parents, meet, target):
+	# Points the forward parent links along the backward search's path from
+	# the meeting cell to the finish cell, so the whole path can be built
+	# from the forward links
+	current = meet
+
+	while current != target:
+		following = backward_parents[current]
+		parents[following] = current
+		grid.stamps[following] = grid.generation
+		current = following
+
+def bidirectional_bfs(grid, start, finish, visit = None, visit_back = None):
+	# Performs breadth first search from both the start and the finish cell,
+	# growing the smaller frontier one layer at a time until they meet.
+	# visit_back is called for the cells expanded from the finish cell.
+	source = grid.index(*start)
+	target = grid.index(*finish)
+	offsets = grid.offsets
+	adjacency = grid.adjacency
+
+	# Both sides stamp the cells they reach with the search's generation
+	parents, depth, stamps, mark = grid.search_tables()
+	backward_parents, backward_depth, backward_stamps = grid.backward_tables()
+	parents[source] = source
+	depth[source] = 0
+	stamps[source] = mark
+	backward_parents[target] = target
+	backward_depth[target] = 0
+	backward_stamps[target] = mark
+
+	frontier = [source]
+	backward_frontier = [target]
+	best = UNREACHED
+	meet = -1
+	expanded = 0
+	max_frontier = 2
+	pushes = 2
+	neighbor_calls = 0
+
+	while frontier and backward_frontier and meet == -1:
+		# Grows the smaller side
+		if len(frontier) <= len(backward_frontier):
+			layer, own_parents, own_depth, own_stamps, other_depth, other_stamps, callback = \
+				frontier, parents, depth, stamps, backward_depth, backward_stamps, visit
+		else:
+			layer, own_parents, own_depth, own_stamps, other_depth, other_stamps, callback = \
+				backward_frontier, backward_parents, backward_depth, backward_stamps, depth, stamps, visit_back
+
+		following = []
+		for current in layer:
+			expanded += 1
+			if callback:
+				callback(*grid.coords(current))
+
+			neighbor_calls += 1
+			for delta in offsets[adjacency[current]]:
+				neighbor = current + delta
+
+				if own_stamps[neighbor] != mark:
+					own_stamps[neighbor] = mark
+					own_parents[neighbor] = current
+					own_depth[neighbor] = own_depth[current] + 1
+					following.append(neighbor)
+					pushes += 1
+
+				# The whole layer is finished so the shortest meeting is kept
+				if other_stamps[neighbor] == mark and own_depth[neighbor] + other_depth[neighbor] < best:
+					best = own_depth[neighbor] + other_depth[neighbor]
+					meet = neighbor
+
+		if layer is frontier:
+			frontier = following
+		else:
+			backward_frontier = following
+
+		max_frontier = max(max_frontier, len(frontier) + len(backward_frontier))
+
+	if meet != -1:
+		join_paths(grid, parents, backward_parents, meet, target)
+
+	return build_result(grid, parents, source, target, expanded, max_frontier = max_frontier,
+		pushes = pushes, neighbor_calls = neighbor_calls)
+
+def bidirectional_a_star(grid, start, finish, visit = None, visit_back = None):
+	# Performs A* from both the start and the finish cell, expanding the side
+	# with the smaller open list. Chebyshev distance is used as the heuristic
+	# since the stopping rule needs one that never overestimates.
+	source = grid.index(*start)
+	target = grid.index(*finish)
+	offsets = grid.offsets
+	adjacency = grid.adjacency
+	costs = grid.costs
+
+	# Cells stamped mark have a g cost from their side, closed ones mark + 1
+	parents, g, stamps, mark = grid.search_tables()
+	backward_parents, backward_g, backward_stamps = grid.backward_tables()
+	parents[source] = source
+	g[source] = 0
+	stamps[source] = mark
+	backward_parents[target] = target
+	backward_g[target] = 0
+	backward_stamps[target] = mark
+	closed = mark + 1
+	heap = [(chebyshev(grid, source, target), source)]
+	backward_heap = [(chebyshev(grid, target, source), target)]
+
+	best = UNREACHED
+	meet = -1
+	expanded = 0
+	max_frontier = 2
+	pushes = 2
+	duplicate_pushes = 0
+	neighbor_calls = 0
+
+	while heap and backward_heap:
+		# Stops once neither side can lead to a cheaper path than the best meeting
+		if heap[0][0] >= best or backward_heap[0][0] >= best:
+			break
+
+		forward = len(heap) <= len(backward_heap)
+		if forward:
+			open_list, own_parents, own_g, own_stamps, other_g, other_stamps, goal, callback = \
+				heap, parents, g, stamps, backward_g, backward_stamps, target, visit
+		else:
+			open_list, own_parents, own_g, own_stamps, other_g, other_stamps, goal, callback = \
+				backward_heap, backward_parents, backward_g, backward_stamps, g, stamps, source, visit_back
+
+		f_cost, current = heapq.heappop(open_list)
+		if own_stamps[current] == closed:
+			continue
+
+		own_stamps[current] = closed
+		expanded += 1
+		if callback:
+			callback(*grid.coords(current))
+
+		neighbor_calls += 1
+		for delta in offsets[adjacency[current]]:
+			neighbor = current + delta
+
+			# Going backwards, the step costs as much as entering the current cell
+			total_cost = own_g[current] + (costs[neighbor] if forward else costs[current])
+
+			if own_stamps[neighbor] < mark or total_cost < own_g[neighbor]:
+				if own_stamps[neighbor] >= mark:
+					duplicate_pushes += 1
+
+				own_stamps[neighbor] = mark
+				own_g[neighbor] = total_cost
+				own_parents[neighbor] = current
+				heapq.heappush(open_list, (total_cost + chebyshev(grid, neighbor, goal), neighbor))
+				pushes += 1
+
+				if other_stamps[neighbor] >= mark and total_cost + other_g[neighbor] < best:
+					best = total_cost + other_g[neighbor]
+					meet = neighbor
+
+		max_frontier = max(max_frontier, len(heap) + len(backward_heap))
+
+	if meet != -1:
+		join_paths(grid, parents, backward_parents, meet, target)
+
+	return build_result(grid, parents, source, target, expanded, max_frontier = max_frontier,
+		pushes = pushes, duplicate_pushes = duplicate_pushes, neighbor_calls = neighbor_calls)
@@ -1,9 +1,8 @@
 from tkinter import font
 from tkinter import ttk
-from grid import init_grid
+from pathfinding_algos import ALGORITHMS
 from constants import RED
 import tkinter as tk
-import pygame
 
 class TK:
 	def __init__(self):
@@ -25,8 +24,8 @@ class TK:
 		self.tile_size_label = tk.Label(self.root, text = "Tile Size:  ", fg = "white", bg = "black", font = self.font)
 
 		# Choices
-		self.algos = ["Dijkstras", "A*", "DFS", "BFS"]
-		self.sizes = ["10x10", "25x25", "40x40"]
+		self.algos = list(ALGORITHMS)
+		self.sizes = ["10x10", "25x25", "40x40", "200x200", "1000x1000", "2000x2000"]
 
 		# Inputs
 		self.selected_size = tk.StringVar()
@@ -43,6 +42,9 @@ class TK:
 
 		self.place_elements()
 
+		# Options picked with the start button, None until then
+		self.options = None
+
 	def center_window(self):
 		# Gets the requested values of the height and widht.
 		windowWidth = self.root.winfo_reqwidth()
@@ -67,10 +69,14 @@ class TK:
 		self.button.place(relx = 0.30, rely = 0.75)
 		
 	def run(self):
+		# Shows the menu until it is closed. Returns the algorithm, rows,
+		# columns and tile size picked, or None if no grid was started.
 		self.root.protocol("WM_DELETE_WINDOW", self.shutdown)
 		self.selected_tile_size.trace("w", self.reset_background_color)
 		self.root.mainloop()
 
+		return self.options
+
 	def reset_background_color(self, *args):
 		if self.tile_size["background"] == "red":
 			self.tile_size.configure({"background": "white"})	
@@ -84,13 +90,9 @@ class TK:
 		try:
 			tile_size = int(self.tile_size.get())
 
-			# Shutdowns the starting window and begins the main program
+			# Shutdowns the starting window, the main program begins once it has returned
+			self.options = (algorithm, rows, cols, tile_size)
 			self.shutdown()
-
-			print("Starting Application...")
-			print("Successfully Loaded!")
-
-			init_grid(algorithm, rows, cols, tile_size)
 		except ValueError:
 			print("Please enter a number!")
 			self.tile_size.configure({"background": "red"})	
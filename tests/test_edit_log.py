@@ -0,0 +1,53 @@
+import pytest
+import search
+from cache import edits_since, EDIT_LOG_SIZE
+
+compact_grid = pytest.importorskip("compact_grid")
+
+def split_map(size = 100):
+	# A wall column splitting the map in two, and a block of walls on the
+	# right, so erasing both is one batch of more than half the log
+	grid = compact_grid.CompactGrid(size, size)
+	walls = bytearray(size * size)
+
+	for row in range(size):
+		walls[row * size + size // 2] = 1
+
+	block = [(row, col) for row in range(80, 98) for col in range(60, 100)]
+	for row, col in block:
+		walls[row * size + col] = 1
+
+	grid.load_walls(walls, (0, 0), (0, size - 1))
+	column = [(row, size // 2) for row in range(size)]
+
+	return grid, column + block
+
+def test_batches_are_never_partly_dropped():
+	grid, erased = split_map()
+	assert not grid.components.connected(grid, grid.start, grid.finish)
+	version = grid.version
+
+	grid.edit_cells(erased, False)
+	grid.edit_cells([(row, col) for row in range(10, 30) for col in range(40)], True)
+
+	# The first batch no longer fits next to the second, so it is dropped whole
+	assert edits_since(grid, version) is None
+	assert len(grid.edits) <= EDIT_LOG_SIZE
+	assert len({edit[0] for edit in grid.edits}) == 1
+
+	assert search.bfs(grid, grid.start, grid.finish).found
+	assert grid.components.connected(grid, grid.start, grid.finish)
+
+def test_single_edits_drop_whole_batches():
+	grid, erased = split_map()
+	version = grid.version
+	grid.edit_cells(erased, False)
+
+	count = EDIT_LOG_SIZE - len(erased) + 1
+	for i in range(count):
+		grid.place_obstacle((1 + i // 40, i % 40))
+
+	# The batch lost its oldest entry, so none of it is kept, while the
+	# single edits after it are all still there
+	assert edits_since(grid, version) is None
+	assert len(edits_since(grid, version + 1)) == count
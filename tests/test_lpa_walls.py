@@ -0,0 +1,38 @@
+import os
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+
+import grid as G
+from constants import WALLS
+from pathfinding_algos import lpa_star
+from thread import Thread
+
+def test_wall_placed_on_path_can_be_erased():
+	G.init_window(10, 10, 10)
+	G.algo = "LPA*"
+	grid = G.Grid(10, 10)
+	grid.draw()
+	grid.place_start((5, 0), (0, 5))
+	grid.place_finish((5, 9), (9, 5))
+
+	thread = Thread()
+	thread.turn_on()
+	lpa_star(grid, thread)
+	path = grid.last_run[-1].path
+	row, col = path[len(path) // 2]
+
+	# Walls the middle of the path, and repairs it as the main loop does
+	pos = (col * G.TILE_SIZE, row * G.TILE_SIZE)
+	grid.edit_walls(pos, True)
+	grid.replan()
+
+	assert grid.model.is_wall((row, col))
+	assert grid.matrix[row][col].color == WALLS
+
+	grid.edit_walls(pos, False)
+	assert not grid.model.is_wall((row, col))
+	assert grid.matrix[row][col].color != WALLS
+
+	pygame.quit()
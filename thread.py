@@ -1,13 +1,25 @@
+from instrumentation import SearchStats
+
 class Thread:
-	def __init__(self):
+	def __init__(self, profile_cpu = False, trace_memory = False, animate = True):
 		self.is_threading = False
 		self.is_finding_path = False
 		self.finished_state = False
 		self.path_exists = True
 
+		# Counters and timings of the current or last search
+		self.stats = None
+		self.profile_cpu = profile_cpu
+		self.trace_memory = trace_memory
+
+		# Whether searches that show their progress a frame at a time wait
+		# for the frames, off when nothing is drawn
+		self.animate = animate
+
 	def turn_on(self):
 		self.is_threading = True
 		self.is_finding_path = True
+		self.stats = SearchStats(self.profile_cpu, self.trace_memory)
 
 	def turn_off(self):
 		self.is_threading = False
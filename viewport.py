@@ -0,0 +1,113 @@
+import pygame
+from constants import *
+from compact_grid import EMPTY, WALL, START, FINISH, VISITED, SHORTEST_PATH
+
+# Pixels per cell the viewport can zoom to. Below 1 only every few cells
+# are drawn, one per pixel.
+ZOOM_LEVELS = (0.125, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+# Zoom from which lines are drawn between the cells
+GRID_LINES_ZOOM = 8
+
+# Pixels panned by one press of an arrow key
+PAN_STEP = 64
+
+class Viewport:
+	def __init__(self, grid, width, height, zoom):
+		# Draws the part of a CompactGrid seen through a window of width x
+		# height pixels. The state array of the grid is the color buffer: the
+		# visible cells are blitted as they are into an 8-bit surface whose
+		# palette holds the color of every state, then scaled up, so a frame
+		# costs as much as the pixels on screen and not the number of cells.
+		self.grid = grid
+		self.width = width
+		self.height = height
+		self.zoom = max([level for level in ZOOM_LEVELS if level <= zoom], default = ZOOM_LEVELS[0])
+
+		# Cell at the top left corner of the window, in fractions of a cell
+		self.left = 0.0
+		self.top = 0.0
+
+		colors = {EMPTY: BLACK, WALL: WALLS, START: RED, FINISH: GREEN, VISITED: PATH, SHORTEST_PATH: FINAL_PATH}
+		self.palette = [colors.get(state, BLACK) for state in range(256)]
+
+	def clamp(self):
+		# Keeps the map in the window, or at the top left if it is smaller
+		self.left = min(max(self.left, 0.0), max(self.grid.cols - self.width / self.zoom, 0.0))
+		self.top = min(max(self.top, 0.0), max(self.grid.rows - self.height / self.zoom, 0.0))
+
+	def pan(self, dx, dy):
+		# Moves the map by dx, dy pixels
+		self.left -= dx / self.zoom
+		self.top -= dy / self.zoom
+		self.clamp()
+
+	def zoom_at(self, pos, steps):
+		# Zooms in or out by some levels, keeping the cell under pos in place
+		x, y = pos
+		col = self.left + x / self.zoom
+		row = self.top + y / self.zoom
+
+		level = ZOOM_LEVELS.index(self.zoom) + steps
+		self.zoom = ZOOM_LEVELS[min(max(level, 0), len(ZOOM_LEVELS) - 1)]
+
+		self.left = col - x / self.zoom
+		self.top = row - y / self.zoom
+		self.clamp()
+
+	def cell_at(self, pos):
+		# Cell under a point of the window, or None outside the map
+		x, y = pos
+
+		if not (0 <= x < self.width and 0 <= y < self.height):
+			return None
+
+		row = int(self.top + y / self.zoom)
+		col = int(self.left + x / self.zoom)
+
+		if row >= self.grid.rows or col >= self.grid.cols:
+			return None
+
+		return row, col
+
+	def draw(self, surface):
+		# Draws the visible cells and returns the area of the window drawn
+		area = pygame.Rect(0, 0, self.width, self.height)
+		cells = self.grid.state.reshape(self.grid.rows, self.grid.cols)
+
+		# Zoomed out, every step-th cell is one pixel. Zoomed in, a cell is
+		# scale pixels and the first one may be partly hidden.
+		step = max(1, round(1 / self.zoom))
+		scale = max(1, int(self.zoom))
+		left = int(self.left) // step * step
+		top = int(self.top) // step * step
+		dx = int((self.left - left) * self.zoom) if step == 1 else 0
+		dy = int((self.top - top) * self.zoom) if step == 1 else 0
+
+		visible = cells[top:top + (-(-(self.height + dy) // scale)) * step:step,
+			left:left + (-(-(self.width + dx) // scale)) * step:step]
+
+		image = pygame.Surface((visible.shape[1], visible.shape[0]), depth = 8)
+		image.set_palette(self.palette)
+		pygame.surfarray.blit_array(image, visible.T)
+
+		if scale > 1:
+			image = pygame.transform.scale(image, (image.get_width() * scale, image.get_height() * scale))
+
+		surface.set_clip(area)
+		surface.fill(BLACK, area)
+		surface.blit(image, (-dx, -dy))
+
+		if self.zoom >= GRID_LINES_ZOOM:
+			right = image.get_width() - dx
+			bottom = image.get_height() - dy
+
+			for x in range(-dx, right + 1, scale):
+				pygame.draw.line(surface, GRID, (x, 0), (x, bottom))
+
+			for y in range(-dy, bottom + 1, scale):
+				pygame.draw.line(surface, GRID, (0, y), (right, y))
+
+		surface.set_clip(None)
+
+		return area
@@ -0,0 +1,159 @@
+import mmap
+import struct
+import sys
+from array import array
+
+# Layout of a trace file: the header, the walls of the map (one byte per
+# cell, padded to a multiple of 4), the visited cells and the path, both as
+# little endian int32 flat indices. The cells a bidirectional search
+# expanded from the finish are stored as ~index, so they are negative.
+MAGIC = b'PFTRACE2'
+HEADER = struct.Struct('<8sIIiiIId32sI')
+
+# Version 1 traces have a shorter name and no flags, and are still read
+OLD_MAGIC = b'PFTRACE1'
+OLD_HEADER = struct.Struct('<8sIIiiIId16s')
+
+# Flags of the header
+BIDIRECTIONAL = 1
+
+class TraceRecorder:
+	def __init__(self, grid, visit = None, bidirectional = False):
+		# Records the visit stream of a search while forwarding it to visit
+		self.grid = grid
+		self.forward = visit
+		self.bidirectional = bidirectional
+		self.visits = array('i')
+
+	def visit(self, row, col, *args):
+		self.visits.append(row * self.grid.cols + col)
+
+		if self.forward:
+			self.forward(row, col, *args)
+
+	def visit_backward(self, row, col, *args):
+		# Records a cell expanded from the finish by a bidirectional search
+		self.visits.append(~(row * self.grid.cols + col))
+
+		if self.forward:
+			self.forward(row, col, *args)
+
+	def save(self, filename, algorithm, start, finish, result):
+		path = array('i', [self.grid.index(*coords) for coords in result.path])
+		flags = BIDIRECTIONAL if self.bidirectional else 0
+		save(filename, self.grid, algorithm, start, finish, self.visits, path, result.cost, flags)
+
+def padding(size):
+	return -size % 4
+
+def little_endian(values):
+	# Returns the bytes of an int32 array in the byte order of the file format
+	if sys.byteorder == 'big':
+		values = array('i', values)
+		values.byteswap()
+
+	return values.tobytes()
+
+def save(filename, grid, algorithm, start, finish, visits, path, cost, flags = 0):
+	# Writes a trace of a search on grid to filename. Names longer than the
+	# 32 bytes of the header are cut.
+	start = grid.index(*start) if start else -1
+	finish = grid.index(*finish) if finish else -1
+	walls = bytes(grid.walls)
+
+	with open(filename, 'wb') as file:
+		file.write(HEADER.pack(MAGIC, grid.rows, grid.cols, start, finish, len(visits), len(path),
+			float(cost), algorithm.encode()[:32], flags))
+		file.write(walls)
+		file.write(bytes(padding(len(walls))))
+		file.write(little_endian(visits))
+		file.write(little_endian(path))
+
+class Trace:
+	def __init__(self, filename):
+		# Memory maps a trace file. The visits and path are read straight from
+		# the mapping, so opening a trace does not depend on its length.
+		with open(filename, 'rb') as file:
+			self.map = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+
+		magic = self.map[:len(MAGIC)]
+
+		if magic == MAGIC:
+			header = HEADER
+			fields = HEADER.unpack_from(self.map)
+		elif magic == OLD_MAGIC:
+			header = OLD_HEADER
+			fields = OLD_HEADER.unpack_from(self.map) + (0,)
+		else:
+			self.map.close()
+			raise ValueError("{} is not a trace file".format(filename))
+
+		_, self.rows, self.cols, start, finish, visit_count, path_count, self.cost, algorithm, flags = fields
+
+		self.algorithm = algorithm.rstrip(b'\0').decode(errors = 'replace')
+		self.bidirectional = bool(flags & BIDIRECTIONAL)
+		self.start = divmod(start, self.cols) if start >= 0 else None
+		self.finish = divmod(finish, self.cols) if finish >= 0 else None
+
+		size = self.rows * self.cols
+		offset = header.size
+		view = memoryview(self.map)
+		self.walls = view[offset:offset + size]
+
+		offset += size + padding(size)
+		self.visits = self.int_view(view, offset, visit_count)
+
+		offset += visit_count * 4
+		self.path = self.int_view(view, offset, path_count)
+
+	def int_view(self, view, offset, count):
+		values = view[offset:offset + count * 4].cast('i')
+
+		# Big endian machines get a swapped copy instead of the mapping itself
+		if sys.byteorder == 'big':
+			values = array('i', values)
+			values.byteswap()
+
+		return values
+
+	def __len__(self):
+		return len(self.visits)
+
+	def coords(self, index):
+		return divmod(index, self.cols)
+
+	def wall_coords(self):
+		# Coordinates of every wall of the recorded map
+		return [self.coords(i) for i in range(self.rows * self.cols) if self.walls[i]]
+
+	def visit(self, step):
+		# Cell expanded at step, and whether it was expanded from the finish
+		index = self.visits[step]
+
+		if index < 0:
+			return self.coords(~index), True
+
+		return self.coords(index), False
+
+	def path_coords(self):
+		return [self.coords(i) for i in self.path]
+
+	def close(self):
+		# Releases the memoryviews before the mapping they point into
+		self.walls.release()
+		if isinstance(self.visits, memoryview):
+			self.visits.release()
+			self.path.release()
+		self.map.close()
+
+def first_difference(a, b):
+	# Returns the first step at which two traces expanded different cells,
+	# or None if their visit orders are identical
+	for step in range(min(len(a), len(b))):
+		if a.visits[step] != b.visits[step]:
+			return step
+
+	if len(a) != len(b):
+		return min(len(a), len(b))
+
+	return None
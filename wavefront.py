@@ -0,0 +1,125 @@
+from search import DIRECTIONS, SearchResult
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+def padded_free(grid):
+	# Passable cells of the grid with a border of walls around them, so
+	# neighbor offsets on the flattened array never wrap to another row
+	if np is None:
+		raise ImportError("the wavefront search requires numpy")
+
+	walls = np.frombuffer(grid.walls, dtype = np.uint8) if isinstance(grid.walls, (bytes, bytearray)) else np.asarray(grid.walls)
+	free = np.zeros((grid.rows + 2, grid.cols + 2), dtype = bool)
+	free[1:-1, 1:-1] = walls.reshape(grid.rows, grid.cols) == 0
+
+	return free.ravel()
+
+def expand(grid, start, free, distances, stop = None, on_layer = None):
+	# Grows the wavefront one layer at a time. Every layer is computed at
+	# once from the flat indices of the previous one, so the total work is
+	# proportional to the number of cells reached. Returns the number of cells reached.
+	width = grid.cols + 2
+	deltas = np.array([dr * width + dc for dr, dc in DIRECTIONS], dtype = np.int64)
+
+	frontier = np.array([(start[0] + 1) * width + start[1] + 1], dtype = np.int64)
+	distances[frontier] = 0
+	reached = 1
+	layer = 0
+
+	# Scratch array used to drop cells reached from two frontier cells at once
+	# without sorting: only the last write to a cell survives
+	owner = np.empty(free.size, dtype = np.int64)
+
+	while frontier.size:
+		if on_layer:
+			on_layer(layer, frontier)
+
+		if stop is not None and distances[stop] != -1:
+			break
+
+		layer += 1
+		candidates = (frontier[:, None] + deltas).ravel()
+		candidates = candidates[free[candidates] & (distances[candidates] == -1)]
+
+		order = np.arange(candidates.size)
+		owner[candidates] = order
+		candidates = candidates[owner[candidates] == order]
+
+		distances[candidates] = layer
+		reached += candidates.size
+		frontier = candidates
+
+	return reached
+
+def distance_field(grid, start, on_layer = None):
+	# Number of steps from start to every cell of the grid, -1 where a cell
+	# cannot be reached. on_layer(layer, cells) is called with the (row, col)
+	# arrays of every layer as it is reached.
+	free = padded_free(grid)
+	distances = np.full(free.size, -1, dtype = np.int32)
+	width = grid.cols + 2
+
+	def callback(layer, frontier):
+		rows, cols = np.divmod(frontier, width)
+		on_layer(layer, (rows - 1, cols - 1))
+
+	expand(grid, start, free, distances, on_layer = callback if on_layer else None)
+
+	return distances.reshape(grid.rows + 2, width)[1:-1, 1:-1]
+
+def extract_path(distances, finish):
+	# Walks down the distance field from finish to the cell at distance 0.
+	# Returns the path as (row, col) pairs from start to finish, or an empty
+	# list if finish was not reached.
+	rows, cols = distances.shape
+	row, col = finish
+
+	if distances[row, col] < 0:
+		return []
+
+	path = [(row, col)]
+	while distances[row, col] > 0:
+		target = distances[row, col] - 1
+
+		for dr, dc in DIRECTIONS:
+			r = row + dr
+			c = col + dc
+
+			if 0 <= r < rows and 0 <= c < cols and distances[r, c] == target:
+				row, col = r, c
+				break
+
+		path.append((row, col))
+
+	path.reverse()
+	return path
+
+def wavefront(grid, start, finish, visit = None, layer_done = None):
+	# Performs breadth first search a whole layer at a time. Stops at the
+	# layer that reaches finish. Every cell is counted as one step,
+	# whatever its cost.
+	free = padded_free(grid)
+	distances = np.full(free.size, -1, dtype = np.int32)
+	width = grid.cols + 2
+	target = (finish[0] + 1) * width + finish[1] + 1
+	max_frontier = [0]
+
+	def on_layer(layer, frontier):
+		max_frontier[0] = max(max_frontier[0], frontier.size)
+
+		if visit:
+			rows, cols = np.divmod(frontier, width)
+			for row, col in zip((rows - 1).tolist(), (cols - 1).tolist()):
+				visit(row, col)
+
+		if layer_done:
+			layer_done()
+
+	reached = expand(grid, start, free, distances, target, on_layer)
+	path = extract_path(distances.reshape(grid.rows + 2, width)[1:-1, 1:-1], finish)
+
+	cost = sum(grid.costs[grid.index(*coords)] for coords in path[1:]) if path else float('inf')
+	return SearchResult(path, cost, reached, max_frontier = max_frontier[0], pushes = reached)